@@ -0,0 +1,126 @@
+# ann_index.py
+import numpy as np
+from scipy import sparse
+
+from embedding_matrix import EmbeddingMatrix, normalise_rows
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index over unit-norm embeddings.
+
+    A spherical k-means coarse quantizer splits the templates into ``n_lists``
+    clusters. A query is only compared against the members of its ``n_probe``
+    closest clusters, so raising ``n_probe`` trades latency for recall and
+    ``n_probe == n_lists`` is exact.
+    """
+
+    def __init__(self, embeddings, n_lists=None, n_probe=None, n_iter=20, seed=0):
+        # Template rows are read through an EmbeddingMatrix, whatever their storage dtype
+        if not isinstance(embeddings, EmbeddingMatrix):
+            embeddings = EmbeddingMatrix(embeddings)
+        self.embeddings = embeddings
+        n_items = len(self.embeddings)
+        self.n_lists = max(1, min(n_items, n_lists or int(np.sqrt(n_items))))
+        self.n_probe = max(1, min(self.n_lists, n_probe or max(1, self.n_lists // 10)))
+        self.n_iter = n_iter
+        self.seed = seed
+        self._train()
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def _assign(self, vectors, centroids, chunk_size=8192):
+        """Index of the most similar centroid for every vector"""
+        labels = np.empty(len(vectors), dtype=np.intp)
+        for start in range(0, len(vectors), chunk_size):
+            block = vectors[start:start + chunk_size]
+            labels[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def _train(self):
+        """Run spherical k-means and lay the list members out contiguously"""
+        rng = np.random.default_rng(self.seed)
+        vectors = self.embeddings.to_float32()
+        centroids = vectors[rng.choice(len(vectors), self.n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            labels = self._assign(vectors, centroids)
+            membership = sparse.csr_matrix(
+                (np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+                shape=(self.n_lists, len(labels)),
+            )
+            sums = np.asarray(membership @ vectors)
+            counts = np.bincount(labels, minlength=self.n_lists)
+
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty clusters from random points
+                sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            new_centroids = sums / norms
+            if np.allclose(new_centroids, centroids, atol=1e-6):
+                centroids = new_centroids
+                break
+            centroids = new_centroids
+
+        labels = self._assign(vectors, centroids)
+        self.centroids = centroids
+        self.list_ids = np.argsort(labels, kind='stable')
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=self.n_lists))])
+
+    def _normalise(self, query_embeddings):
+        return normalise_rows(query_embeddings)
+
+    def probe(self, query_embeddings, n_probe=None):
+        """Template ids in the ``n_probe`` closest lists of each query"""
+        n_probe = max(1, min(self.n_lists, n_probe or self.n_probe))
+        centroid_scores = self._normalise(query_embeddings) @ self.centroids.T
+        if n_probe < self.n_lists:
+            lists = np.argpartition(-centroid_scores, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            lists = np.tile(np.arange(self.n_lists), (len(centroid_scores), 1))
+
+        return [
+            np.concatenate([
+                self.list_ids[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+                for list_id in row
+            ])
+            for row in lists
+        ]
+
+    def partial_scores(self, query_embeddings, n_probe=None):
+        """Cosine scores for probed templates, -inf everywhere else; one row per query"""
+        queries = self._normalise(query_embeddings)
+        scores = np.full((len(queries), len(self.embeddings)), -np.inf, dtype=np.float32)
+        for row, candidates in enumerate(self.probe(queries, n_probe)):
+            scores[row, candidates] = self.embeddings[candidates] @ queries[row]
+        return scores
+
+    def search(self, query_embeddings, top_k=20, n_probe=None):
+        """Approximate top-k template ids per query, best first"""
+        scores = self.partial_scores(query_embeddings, n_probe)
+        top_k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        results = np.take_along_axis(top, order, axis=1)
+        return [row[np.isfinite(scores[i, row])] for i, row in enumerate(results)]
+
+    def recall_at_k(self, query_embeddings, top_k=20, n_probe=None):
+        """Mean fraction of the exact top-k that the approximate search returns"""
+        queries = self._normalise(query_embeddings)
+        top_k = min(top_k, len(self.embeddings))
+        exact_scores = self.embeddings.dot(queries)
+        exact = np.argpartition(-exact_scores, top_k - 1, axis=1)[:, :top_k]
+        approx = self.search(queries, top_k, n_probe)
+        hits = [len(np.intersect1d(e, a)) for e, a in zip(exact, approx)]
+        return float(np.mean(hits)) / top_k
+
+    def tune_n_probe(self, query_embeddings, top_k=20, target_recall=0.95):
+        """Smallest n_probe reaching ``target_recall`` on the given queries; also sets it as the default"""
+        n_probe = 1
+        while n_probe < self.n_lists and self.recall_at_k(query_embeddings, top_k, n_probe) < target_recall:
+            n_probe *= 2
+        self.n_probe = min(n_probe, self.n_lists)
+        return self.n_probe
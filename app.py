@@ -1,8 +1,40 @@
 # app.py
+import os
+import requests
 import streamlit as st
 import pandas as pd
-from data_loader import DataLoader
+from data_loader import DEFAULT_SNAPSHOT_DIR, DataLoader
 from finder import TemplateFinder
+from embedding_cache import DEFAULT_CACHE_DIR, EmbeddingCache
+from embedding_backend import cache_model_name
+from query_cache import QueryResultCache
+from instrumentation import Instrumentation
+from search_service import SearchClient
+from facets import normalise_filters
+
+# Share one result cache between all sessions, or keep one per browser session
+SHARE_RESULT_CACHE = True
+
+# Show the collapsible stage timing/memory panel under the results
+SHOW_DIAGNOSTICS = False
+
+# Query encoder: 'float32' or the int8 dynamically-quantized 'int8'; torch CPU threads (None = default);
+# storage of the template embedding matrix: 'float32', 'float16' or 'int8'
+EMBEDDING_BACKEND = 'float32'
+EMBEDDING_THREADS = None
+EMBEDDING_DTYPE = 'float32'
+
+# 'full' scores every template per query; 'cascade' re-ranks only the best TF-IDF candidates
+# (topped up by embedding neighbours), keeping latency flatter as the catalog grows
+RETRIEVAL = 'full'
+CASCADE_CANDIDATES = 200
+
+# Results requested per search, and cards added by each "Show more" (a multiple of the 3-card row)
+SEARCH_TOP_K = 20
+RESULTS_PAGE_SIZE = 6
+
+# Base URL of a shared search_service.py; when set, queries go there instead of a model loaded in this process
+SEARCH_SERVICE_URL = os.environ.get('TEMPLATE_SEARCH_URL')
 
 def main():
     st.set_page_config(
@@ -15,14 +47,46 @@ def main():
     @st.cache_resource
     def init_components():
         """Initializes the data loader and finder once."""
-        data_loader = DataLoader()
+        if SEARCH_SERVICE_URL:
+            search_client = SearchClient(SEARCH_SERVICE_URL)
+            try:
+                search_client.health()
+            except requests.RequestException:
+                return None, None
+            return None, search_client
+        
+        instrumentation = Instrumentation(sample_memory=SHOW_DIAGNOSTICS)
+        data_loader = DataLoader(
+            snapshot_dir=DEFAULT_SNAPSHOT_DIR, max_staleness=24 * 60 * 60, instrumentation=instrumentation
+        )
         if data_loader.authenticate_gspread():
             if data_loader.load_data():
-                template_finder = TemplateFinder(data_loader)
+                embedding_cache = EmbeddingCache(
+                    DEFAULT_CACHE_DIR, cache_model_name(TemplateFinder.MODEL_NAME, EMBEDDING_BACKEND)
+                )
+                template_finder = TemplateFinder(
+                    data_loader,
+                    embedding_cache=embedding_cache,
+                    result_cache=QueryResultCache() if SHARE_RESULT_CACHE else None,
+                    instrumentation=instrumentation,
+                    embedding_backend=EMBEDDING_BACKEND,
+                    num_threads=EMBEDDING_THREADS,
+                    embedding_dtype=EMBEDDING_DTYPE,
+                    retrieval=RETRIEVAL,
+                    cascade_candidates=CASCADE_CANDIDATES,
+                )
+                # Rebuild the search index whenever a background refresh brings new sheet data
+                data_loader.add_listener(lambda loader: template_finder.build_index())
+                template_finder.build_index()
                 return data_loader, template_finder
         return None, None
 
     data_loader, template_finder = init_components()
+    if data_loader is not None:
+        data_loader.maybe_refresh()
+        render_reload_controls(data_loader, template_finder)
+    if not SHARE_RESULT_CACHE and 'result_cache' not in st.session_state:
+        st.session_state['result_cache'] = QueryResultCache()
     
     # --- Header ---
     st.title("HockeyCurve Template Assistant")
@@ -33,82 +97,217 @@ def main():
     query = st.text_input(
         "Search for templates", 
         placeholder="e.g., fashion, automotive, gaming...",
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        key="query",
     )
+    filters = None
+    if template_finder is not None:
+        render_keyword_suggestions(template_finder, query)
+        filters = render_search_filters(template_finder)
     
     # --- Main Logic ---
     if template_finder is None:
         st.error("❌ Failed to initialize. Please check your Google Sheets configuration and refresh.")
     elif query:
-        with st.spinner(f"🔍 Finding templates for '{query}'..."):
-            recommendations = template_finder.find_similar_templates(query, top_k=20)
-            
+        try:
+            recommendations = run_search(template_finder, query, filters)
+        except requests.RequestException:
+            # The shared search service restarted or timed out after init_components cached its client
+            st.error("❌ The search service is not responding. Please try again in a moment.")
+        else:
             if not recommendations.empty:
                 st.success(f"Found {len(recommendations)} recommended templates for '**{query}**'")
+                if recommendations.attrs.get('search_mode') == 'tfidf' and not template_finder.model_ready.is_set():
+                    st.caption("⚡ Showing keyword matches while the semantic model loads; results will refine shortly.")
                 st.write("") 
-
-                # --- Create a 3-column grid for the desktop view ---
-                col1, col2, col3 = st.columns(3)
-                
-                # Iterate through recommendations and place them in columns
-                for index, row in recommendations.iterrows():
-                    # Determine which column to place the card in
-                    if index % 3 == 0:
-                        with col1:
-                            with st.container(border=True):
-                                st.subheader(row['Template Name'])
-                                st.write(row.get('Description', 'No description available.'))
-                                if 'Associated Clients' in row and row['Associated Clients']:
-                                    st.caption(f"Previously used by: {row['Associated Clients']}")
-                                
-                                metric_col1, metric_col2 = st.columns(2)
-                                metric_col1.metric("Match Score", f"{row['Similarity Score']}%")
-                                metric_col2.metric("Avg. CTR", f"{row.get('avg_ctr', 'N/A')}")
-
-                                preview_url = row.get('Open Preview', '')
-                                if pd.notna(preview_url) and str(preview_url).startswith('http'):
-                                    st.link_button("🔗 Open Preview", preview_url, use_container_width=True)
-                                else:
-                                    st.button("No Preview", disabled=True, use_container_width=True)
-                    elif index % 3 == 1:
-                        with col2:
-                            with st.container(border=True):
-                                st.subheader(row['Template Name'])
-                                st.write(row.get('Description', 'No description available.'))
-                                if 'Associated Clients' in row and row['Associated Clients']:
-                                    st.caption(f"Previously used by: {row['Associated Clients']}")
-
-                                metric_col1, metric_col2 = st.columns(2)
-                                metric_col1.metric("Match Score", f"{row['Similarity Score']}%")
-                                metric_col2.metric("Avg. CTR", f"{row.get('avg_ctr', 'N/A')}")
-
-                                preview_url = row.get('Open Preview', '')
-                                if pd.notna(preview_url) and str(preview_url).startswith('http'):
-                                    st.link_button("🔗 Open Preview", preview_url, use_container_width=True)
-                                else:
-                                    st.button("No Preview", disabled=True, use_container_width=True)
-                    else:
-                        with col3:
-                            with st.container(border=True):
-                                st.subheader(row['Template Name'])
-                                st.write(row.get('Description', 'No description available.'))
-                                if 'Associated Clients' in row and row['Associated Clients']:
-                                    st.caption(f"Previously used by: {row['Associated Clients']}")
-
-                                metric_col1, metric_col2 = st.columns(2)
-                                metric_col1.metric("Match Score", f"{row['Similarity Score']}%")
-                                metric_col2.metric("Avg. CTR", f"{row.get('avg_ctr', 'N/A')}")
-                                
-                                preview_url = row.get('Open Preview', '')
-                                if pd.notna(preview_url) and str(preview_url).startswith('http'):
-                                    st.link_button("🔗 Open Preview", preview_url, use_container_width=True)
-                                else:
-                                    st.button("No Preview", disabled=True, use_container_width=True)
-
+                render_results()
+            elif filters and any(filters.values()):
+                st.warning(f"No templates matching the selected filters were found for '{query}'. Try removing a filter.")
             else:
                 st.warning(f"No matching templates found for '{query}'. Please try rephrasing your query.")
     else:
         st.info("💡 Please enter a search query to find relevant templates.")
+    
+    if SHOW_DIAGNOSTICS and template_finder is not None:
+        render_diagnostics(template_finder)
+
+
+def run_search(template_finder, query, filters):
+    """Search once per distinct query, filters, search mode and data version; reruns reuse the stored results.
+    
+    The search box only sends its value on Enter or blur, so keystrokes never
+    rerun the page; this keeps every other rerun (suggestions, sidebar, the
+    results fragment) from searching again for the same input.
+    """
+    index = getattr(template_finder, 'index', None)
+    search_key = (
+        ' '.join(query.lower().split()),
+        normalise_filters(filters),
+        template_finder.search_mode(),
+        getattr(index, 'data_version', None),
+    )
+    if st.session_state.get('search_key') != search_key:
+        with st.spinner(f"🔍 Finding templates for '{query}'..."):
+            st.session_state['search_results'] = template_finder.find_similar_templates(
+                query, top_k=SEARCH_TOP_K, result_cache=st.session_state.get('result_cache'), filters=filters
+            )
+        st.session_state['search_key'] = search_key
+        st.session_state['results_shown'] = RESULTS_PAGE_SIZE
+    return st.session_state['search_results']
+
+
+def _show_more():
+    st.session_state['results_shown'] = st.session_state.get('results_shown', RESULTS_PAGE_SIZE) + RESULTS_PAGE_SIZE
+
+
+@st.fragment
+def render_results():
+    """Result cards from the stored search, a page at a time.
+    
+    Runs as a fragment: "Show more" reruns only this function, which renders
+    from st.session_state without searching again.
+    """
+    recommendations = st.session_state.get('search_results')
+    if recommendations is None or recommendations.empty:
+        return
+    
+    shown = recommendations.head(st.session_state.get('results_shown', RESULTS_PAGE_SIZE))
+    # --- 3-column grid for the desktop view, filled row by row ---
+    for start in range(0, len(shown), 3):
+        for column, (position, row) in zip(st.columns(3), shown.iloc[start:start + 3].iterrows()):
+            with column:
+                render_template_card(row, position)
+    
+    remaining = len(recommendations) - len(shown)
+    if remaining > 0:
+        st.button(
+            f"Show more ({remaining} more)", on_click=_show_more, key='show_more', use_container_width=True
+        )
+
+
+def render_template_card(row, position):
+    """One recommendation card"""
+    with st.container(border=True):
+        st.subheader(row['Template Name'])
+        st.write(row.get('Description', 'No description available.'))
+        if 'Associated Clients' in row and row['Associated Clients']:
+            st.caption(f"Previously used by: {row['Associated Clients']}")
+        
+        metric_col1, metric_col2 = st.columns(2)
+        metric_col1.metric("Match Score", f"{row['Similarity Score']}%")
+        metric_col2.metric("Avg. CTR", f"{row.get('avg_ctr', 'N/A')}")
+        
+        preview_url = row.get('Open Preview', '')
+        if pd.notna(preview_url) and str(preview_url).startswith('http'):
+            st.link_button("🔗 Open Preview", preview_url, use_container_width=True)
+        else:
+            st.button("No Preview", disabled=True, use_container_width=True, key=f"no_preview_{position}")
+
+
+def _use_suggestion():
+    """Put the clicked keyword suggestion into the search box"""
+    suggestion = st.session_state.get('keyword_suggestion')
+    if suggestion:
+        st.session_state['query'] = suggestion
+    st.session_state['keyword_suggestion'] = None
+
+
+def render_keyword_suggestions(template_finder, query):
+    """Keyword completions for the typed text, or the most popular keywords before anything is typed"""
+    try:
+        if query.strip():
+            suggestions = [s for s in template_finder.suggest_keywords(query) if s != query.strip().lower()]
+        else:
+            suggestions = [keyword for keyword, _ in template_finder.get_popular_keywords(8) if keyword]
+    except requests.RequestException:
+        # Search service unreachable; the search itself reports the error
+        return
+    if suggestions:
+        st.pills(
+            "Suggestions", suggestions, key='keyword_suggestion',
+            on_change=_use_suggestion, label_visibility="collapsed",
+        )
+
+
+def render_search_filters(template_finder):
+    """Facet filters for the search (industry, business niche, client, minimum CTR); returns the filters mapping.
+    
+    Returns None, rendering nothing, when the search service cannot be reached.
+    """
+    try:
+        options = template_finder.get_facet_options()
+    except requests.RequestException:
+        return None
+    with st.expander("Filters", expanded=False):
+        industry_col, niche_col = st.columns(2)
+        industry = industry_col.multiselect("Industry", options['industry'], key='filter_industry')
+        business_niche = niche_col.multiselect("Business niche", options['business_niche'], key='filter_business_niche')
+        client_col, ctr_col = st.columns(2)
+        client = client_col.multiselect("Previously used by", options['client'], key='filter_client')
+        min_avg_ctr = None
+        # A slider needs a range above 0; with no positive CTR there is nothing to filter on
+        if options['avg_ctr'] and options['avg_ctr'][1] > 0:
+            # 0 leaves the CTR unfiltered, so templates without a CTR still show
+            min_avg_ctr = ctr_col.slider(
+                "Minimum avg. CTR", 0.0, float(options['avg_ctr'][1]), 0.0, step=0.05, key='filter_min_avg_ctr'
+            ) or None
+    return {'industry': industry, 'business_niche': business_niche, 'client': client, 'min_avg_ctr': min_avg_ctr}
+
+
+def render_reload_controls(data_loader, template_finder):
+    """Sidebar button to pull new sheet rows without restarting, plus the last reload's outcome"""
+    with st.sidebar:
+        st.markdown("**Template data**")
+        reloading = data_loader.is_refreshing()
+        # The refresh runs in the background; the index is rebuilt and swapped in once it lands
+        if st.button("🔄 Reload data", disabled=reloading, use_container_width=True):
+            data_loader.refresh_async()
+            reloading = True
+        
+        if reloading:
+            st.caption("Reloading in the background; searches keep using the current data.")
+        if data_loader.last_refresh_error is not None:
+            st.caption(f"⚠️ Last reload failed: {data_loader.last_refresh_error}")
+        
+        report = template_finder.last_reload
+        if report:
+            st.caption(
+                f"{report['templates']:,} templates · {report['reencoded']:,} re-encoded in "
+                f"{report['seconds']:.1f}s ({report['added']} added, {report['removed']} removed, "
+                f"{report['changed']} changed)"
+            )
+
+
+def render_diagnostics(template_finder):
+    """Collapsible panel with the last search's stage timings and running per-stage totals"""
+    instrumentation = template_finder.instrumentation
+    with st.expander("🩺 Diagnostics", expanded=False):
+        st.caption(f"Search mode: {template_finder.search_mode()}")
+        if instrumentation.gauges:
+            st.json(instrumentation.gauges, expanded=False)
+        
+        trace = instrumentation.last_trace('search')
+        if trace:
+            st.markdown("**Last search**")
+            st.dataframe(pd.DataFrame([
+                {
+                    'stage': '  ' * record['depth'] + record['stage'],
+                    'ms': round(record['seconds'] * 1000, 2),
+                    'peak memory (KB)': round(record.get('peak_memory_bytes', 0) / 1024, 1),
+                    'counters': ', '.join(f"{key}={value}" for key, value in record['counters'].items()),
+                }
+                for record in trace
+            ]), hide_index=True, use_container_width=True)
+        
+        summary = instrumentation.summary()
+        if summary:
+            st.markdown("**All stages**")
+            st.dataframe(pd.DataFrame(summary), hide_index=True, use_container_width=True)
+        
+        result_cache = st.session_state.get('result_cache') or template_finder.result_cache
+        if result_cache is not None:
+            st.markdown("**Result cache**")
+            st.json(result_cache.stats(), expanded=False)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,106 @@
+# benchmarks/app_rerun.py
+"""End-to-end rerun timings of app.py under Streamlit's AppTest harness.
+
+Starts an in-process search service on synthetic sheets (offline hashing
+encoder), points the app at it through TEMPLATE_SEARCH_URL and times each
+scripted interaction, counting how many of them reached the search endpoint:
+
+    python -m benchmarks.app_rerun --templates 5000 --show-more 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.pipeline_benchmark import HashingEncoder
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+
+APP_PATH = Path(__file__).resolve().parent.parent / 'app.py'
+# Steps that change the query; no other interaction should search
+SEARCH_STEPS = ('search', 'new query')
+
+
+def start_service(n_templates, seed=0):
+    """Run a SearchService on a background event loop; returns (service, loop)"""
+    from finder import TemplateFinder
+    from search_service import SearchService
+
+    template_finder = TemplateFinder(
+        InMemoryDataLoader(*generate_sheets(n_templates, seed=seed)), sentence_model=HashingEncoder(seed=seed)
+    )
+    template_finder.build_index()
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name='search-service', daemon=True).start()
+    service = asyncio.run_coroutine_threadsafe(
+        SearchService(template_finder, host='127.0.0.1', port=0).start(), loop
+    ).result()
+    return service, loop
+
+
+async def stop_service(service):
+    """Stop the service and close the app's still-open keep-alive connections"""
+    await service.stop()
+    connections = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in connections:
+        task.cancel()
+    await asyncio.gather(*connections, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--templates', type=int, default=5000)
+    parser.add_argument('--query', default='cricket quiz for ev launch')
+    parser.add_argument('--show-more', type=int, default=2, help="'Show more' clicks after the search")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    # Deferred so --help works without Streamlit installed
+    from streamlit.testing.v1 import AppTest
+
+    service, loop = start_service(args.templates, args.seed)
+    os.environ['TEMPLATE_SEARCH_URL'] = f"http://127.0.0.1:{service.port}"
+    app = AppTest.from_file(str(APP_PATH), default_timeout=args.timeout)
+    steps = []
+
+    def step(name, interaction):
+        # AppTest cannot send an unselected single-select st.pills (the suggestions) back as None
+        for button_group in app.get('button_group'):
+            button_group.set_value([])
+        searches_before = service.batcher.queries
+        start = time.perf_counter()
+        interaction()
+        steps.append({
+            'step': name,
+            'seconds': time.perf_counter() - start,
+            'searches': service.batcher.queries - searches_before,
+            'cards': len([button for button in app.button if button.key and button.key.startswith('no_preview_')])
+            + len(app.get('link_button')),
+            'exceptions': [str(exception.value) for exception in app.exception],
+        })
+
+    try:
+        step('initial load', app.run)
+        step('search', lambda: app.text_input(key='query').input(args.query).run())
+        for click in range(args.show_more):
+            if not any(button.key == 'show_more' for button in app.button):
+                break
+            step(f'show more {click + 1}', lambda: app.button(key='show_more').click().run())
+        step('rerun, same query', app.run)
+        step('new query', lambda: app.text_input(key='query').input(f"{args.query} banner").run())
+    finally:
+        asyncio.run_coroutine_threadsafe(stop_service(service), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    print(json.dumps({'templates': args.templates, 'steps': steps}, indent=2))
+    # Only the two query changes may reach the search endpoint
+    unexpected = [s['step'] for s in steps if s['searches'] and s['step'] not in SEARCH_STEPS]
+    if unexpected or any(s['exceptions'] for s in steps):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
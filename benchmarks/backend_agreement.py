@@ -0,0 +1,44 @@
+# benchmarks/backend_agreement.py
+"""Compare an embedding backend and storage dtype against the float32 path.
+
+Builds the index on synthetic sheets with the chosen configuration and reports
+top-k ranking agreement with the full-precision model, query latency and the
+size of the template embedding matrix. Needs the sentence-transformer model:
+
+    python -m benchmarks.backend_agreement --backend int8 --embedding-dtype int8 --threads 4
+"""
+import argparse
+import json
+
+from benchmarks.pipeline_benchmark import QUERIES
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+from embedding_backend import BACKENDS
+from embedding_matrix import STORAGE_DTYPES
+from finder import TemplateFinder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--templates', type=int, default=2000)
+    parser.add_argument('--backend', default='int8', choices=sorted(BACKENDS))
+    parser.add_argument('--embedding-dtype', default='float32', choices=STORAGE_DTYPES)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--top-k', type=int, default=20)
+    args = parser.parse_args()
+
+    template_finder = TemplateFinder(
+        InMemoryDataLoader(*generate_sheets(args.templates, seed=0)),
+        load_model_async=False,
+        embedding_backend=args.backend,
+        num_threads=args.threads,
+        embedding_dtype=args.embedding_dtype,
+    )
+    template_finder.build_index()
+    report = template_finder.check_backend_agreement(QUERIES, top_k=args.top_k)
+    report['templates'] = args.templates
+    report['threads'] = args.threads
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# benchmarks/cascade_benchmark.py
+"""Compare cascaded (sparse candidates, dense re-rank) retrieval with the full blended ranking.
+
+For each catalog size, builds an index on synthetic sheets with the offline
+hashing encoder and reports, per candidate-set size, recall@k against the
+full blend plus the time each path takes for the sample queries:
+
+    python -m benchmarks.cascade_benchmark --templates 5000 20000 50000 --candidates 100 200 500
+"""
+import argparse
+import itertools
+import json
+
+from benchmarks.pipeline_benchmark import HashingEncoder
+from benchmarks.search_load import query_stream
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+from finder import TemplateFinder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--templates', type=int, nargs='+', default=[5000, 20000])
+    parser.add_argument('--candidates', type=int, nargs='+', default=[100, 200, 500])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ann', action='store_true', help="use the IVF index for dense fallback and the full path")
+    args = parser.parse_args()
+
+    queries = list(itertools.islice(query_stream(args.seed), args.queries))
+    reports = []
+    for n_templates in args.templates:
+        template_finder = TemplateFinder(
+            InMemoryDataLoader(*generate_sheets(n_templates, seed=args.seed)),
+            sentence_model=HashingEncoder(seed=args.seed),
+            ann_min_templates=0 if args.ann else None,
+            retrieval='cascade',
+        )
+        template_finder.build_index()
+        for candidates in args.candidates:
+            reports.append(template_finder.check_cascade_recall(queries, args.top_k, cascade_candidates=candidates))
+
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == '__main__':
+    main()
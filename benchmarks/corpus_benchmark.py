@@ -0,0 +1,90 @@
+# benchmarks/corpus_benchmark.py
+"""Compare the vectorized create_template_corpus against the original per-template loop.
+
+Run from the repository root:
+
+    python -m benchmarks.corpus_benchmark --templates 10000 --clients 10000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+from finder import KEYWORD_FIELDS, TemplateFinder
+
+
+def legacy_template_corpus(finder):
+    """The original O(templates x clients x profiles) corpus builder, kept as the reference"""
+    template_details = finder.data_loader.get_template_details()
+    template_tags = finder.data_loader.get_template_tags()
+    client_profiles = finder.data_loader.get_client_profiles()
+
+    template_corpus = []
+    template_info = []
+
+    merged_templates = pd.merge(template_details, template_tags, on='template_name', how='left')
+
+    for template_name in template_details['template_name'].unique():
+        template_data = merged_templates[merged_templates['template_name'] == template_name]
+        template_desc = template_data['description'].iloc[0] if not template_data.empty else ""
+        associated_clients = template_data['client_name'].dropna().unique()
+
+        client_keywords = ""
+        for client in associated_clients:
+            client_profile = client_profiles[
+                client_profiles['client_type'].str.contains(str(client), case=False, na=False)
+            ]
+            for _, client_row in client_profile.iterrows():
+                for field in KEYWORD_FIELDS:
+                    if field in client_row and pd.notna(client_row[field]):
+                        client_keywords += " " + str(client_row[field])
+
+        template_corpus.append(finder.preprocess_text(f"{template_desc} {client_keywords}"))
+        template_info.append({
+            'template_name': template_name,
+            'description': template_desc,
+            'associated_clients': list(associated_clients)
+        })
+
+    return template_corpus, template_info
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--templates', type=int, default=10000)
+    parser.add_argument('--clients', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-legacy', action='store_true', help="only time the vectorized builder")
+    args = parser.parse_args()
+
+    sheets = generate_sheets(args.templates, args.clients, seed=args.seed)
+    finder = TemplateFinder(InMemoryDataLoader(*sheets))
+
+    (corpus, info), elapsed = _timed(finder.create_template_corpus)
+    print(f"vectorized: {elapsed:.3f}s for {len(corpus)} templates, {len(sheets[0])} profiles")
+
+    if args.skip_legacy:
+        return
+
+    (legacy_corpus, legacy_info), legacy_elapsed = _timed(legacy_template_corpus, finder)
+    print(f"legacy:     {legacy_elapsed:.3f}s ({legacy_elapsed / max(elapsed, 1e-9):.1f}x slower)")
+
+    identical = corpus == legacy_corpus and [
+        (i['template_name'], i['description'], list(i['associated_clients'])) for i in info
+    ] == [
+        (i['template_name'], i['description'], list(i['associated_clients'])) for i in legacy_info
+    ]
+    print(f"identical output: {identical}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
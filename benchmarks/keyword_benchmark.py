@@ -0,0 +1,83 @@
+# benchmarks/keyword_benchmark.py
+"""Compare the precomputed KeywordIndex with the original Counter-based get_popular_keywords.
+
+Checks that both produce the same top-N and times index construction,
+most_common and autocomplete lookups:
+
+    python -m benchmarks.keyword_benchmark --clients 10000
+"""
+import argparse
+import json
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_sheets
+from finder import KEYWORD_FIELDS
+from keyword_index import KeywordIndex
+
+
+def legacy_popular_keywords(client_profiles, top_n=10):
+    """The original iterrows + Counter implementation, kept as the reference"""
+    all_keywords = []
+
+    for _, row in client_profiles.iterrows():
+        for field in KEYWORD_FIELDS:
+            if field in row and pd.notna(row[field]):
+                keywords = str(row[field]).split(',')
+                all_keywords.extend([kw.strip().lower() for kw in keywords])
+
+    return Counter(all_keywords).most_common(top_n)
+
+
+def _timed(fn, *args, repeat=1):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=10000)
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    client_profiles = generate_sheets(10, args.clients, seed=args.seed)[0]
+    report = {'clients': len(client_profiles)}
+
+    legacy, report['legacy_popular_keywords_s'] = _timed(legacy_popular_keywords, client_profiles, args.top_n)
+    index, report['build_index_s'] = _timed(KeywordIndex.from_profiles, client_profiles, KEYWORD_FIELDS, repeat=3)
+    popular, report['most_common_s'] = _timed(index.most_common, args.top_n, repeat=100)
+    report['phrases'] = len(index)
+    report['identical_top_n'] = popular == legacy
+
+    # Every 1-4 character prefix of the phrases' words, as typed into the search box
+    prefixes = sorted({
+        word[:length] for phrase in index.phrases for word in phrase.split() for length in range(1, 5)
+    })
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix)
+        latencies.append(time.perf_counter() - start)
+    latencies_us = np.array(latencies) * 1e6
+    report['suggest_prefixes'] = len(prefixes)
+    report['suggest_us'] = {
+        'p50': float(np.percentile(latencies_us, 50)),
+        'p99': float(np.percentile(latencies_us, 99)),
+        'max': float(latencies_us.max()),
+    }
+
+    print(json.dumps(report, indent=2))
+    if not report['identical_top_n']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
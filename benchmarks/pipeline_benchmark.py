@@ -0,0 +1,216 @@
+# benchmarks/pipeline_benchmark.py
+"""Time each stage of the TemplateFinder pipeline on synthetic sheets.
+
+Runs fully offline: sheets come from benchmarks.synthetic and semantic scoring
+uses a small hashing encoder instead of the sentence transformer. Results are
+written as JSON so runs from different commits can be compared:
+
+    python -m benchmarks.pipeline_benchmark --scales 100 1000 10000 --output before.json
+    python -m benchmarks.pipeline_benchmark --scales 100 1000 10000 --compare before.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+from catalog import TemplateCatalog
+from finder import TemplateFinder
+from search_index import top_k_indices
+
+DEFAULT_SCALES = [100, 1000, 10000, 100000]
+QUERIES = [
+    'fashion brand awareness campaign',
+    'cricket score interactive banner',
+    'ev launch with store locator',
+    'festive sale scratch card for snacks',
+    'credit cards lead generation',
+]
+STAGES = [
+    'create_template_corpus',
+    'calculate_tfidf_similarity',
+    'calculate_semantic_similarity',
+    'build_catalog',
+    '_build_recommendations_dataframe',
+    'get_popular_keywords',
+    'build_index',
+    'find_similar_templates',
+]
+
+
+class HashingEncoder:
+    """Deterministic stand-in for SentenceTransformer.encode.
+
+    Hashes word unigrams and bigrams, then applies a fixed random projection down
+    to ``dim`` dimensions, so the matrix shapes and dtypes match the real model
+    without downloading anything.
+    """
+
+    def __init__(self, dim=384, n_features=2 ** 14, seed=0):
+        self.hasher = HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False)
+        rng = np.random.default_rng(seed)
+        self.projection = rng.standard_normal((n_features, dim)).astype(np.float32) / np.sqrt(dim)
+
+    def encode(self, texts, **kwargs):
+        embeddings = np.asarray(self.hasher.transform(list(texts)) @ self.projection, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+
+def _time(fn, repeat):
+    """Run ``fn`` ``repeat`` times, returning its last result and the timings in seconds"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def _summary(timings):
+    return {'min': min(timings), 'median': statistics.median(timings), 'runs': len(timings)}
+
+
+def run_scale(n_templates, n_clients=None, repeat=3, seed=0, top_k=20):
+    """Time every pipeline stage for one synthetic dataset size"""
+    sheets = generate_sheets(n_templates, n_clients, seed=seed)
+    data_loader = InMemoryDataLoader(*sheets)
+    template_finder = TemplateFinder(data_loader, sentence_model=HashingEncoder(seed=seed))
+    query = QUERIES[0]
+    stages = {}
+
+    (template_corpus, template_info), timings = _time(template_finder.create_template_corpus, repeat)
+    stages['create_template_corpus'] = _summary(timings)
+
+    tfidf_similarities, timings = _time(
+        lambda: template_finder.calculate_tfidf_similarity(query, template_corpus), repeat
+    )
+    stages['calculate_tfidf_similarity'] = _summary(timings)
+
+    semantic_similarities, timings = _time(
+        lambda: template_finder.calculate_semantic_similarity(query, template_corpus), repeat
+    )
+    stages['calculate_semantic_similarity'] = _summary(timings)
+
+    catalog, timings = _time(
+        lambda: TemplateCatalog(template_info, data_loader.get_template_details(), data_loader.get_template_tags()),
+        repeat,
+    )
+    stages['build_catalog'] = _summary(timings)
+
+    similarities = 0.4 * tfidf_similarities + 0.6 * semantic_similarities
+    top_indices = top_k_indices(similarities[np.newaxis, :], top_k)[0]
+    _, timings = _time(
+        lambda: template_finder._build_recommendations_dataframe(top_indices, similarities, catalog), repeat
+    )
+    stages['_build_recommendations_dataframe'] = _summary(timings)
+
+    _, timings = _time(template_finder.get_popular_keywords, repeat)
+    stages['get_popular_keywords'] = _summary(timings)
+
+    _, timings = _time(template_finder.build_index, repeat)
+    stages['build_index'] = _summary(timings)
+
+    # Per-query latency against the built index, one query at a time as the app issues them
+    timings = []
+    for _ in range(repeat):
+        for text in QUERIES:
+            start = time.perf_counter()
+            template_finder.find_similar_templates(text, top_k=top_k)
+            timings.append(time.perf_counter() - start)
+    stages['find_similar_templates'] = _summary(timings)
+
+    return {
+        'templates': len(template_corpus),
+        'clients': len(sheets[0]),
+        'tag_rows': len(sheets[1]),
+        'search_mode': template_finder.search_mode(),
+        'stages': stages,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales=DEFAULT_SCALES, repeat=3, seed=0, top_k=20, log=None):
+    """Benchmark every scale and return the JSON-serialisable report"""
+    report = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'repeat': repeat,
+        'seed': seed,
+        'top_k': top_k,
+        'results': [],
+    }
+    for n_templates in scales:
+        result = run_scale(n_templates, repeat=repeat, seed=seed, top_k=top_k)
+        report['results'].append(result)
+        if log is not None:
+            timings = ', '.join(f"{stage} {result['stages'][stage]['min']:.4f}s" for stage in STAGES)
+            print(f"{n_templates} templates: {timings}", file=log)
+    return report
+
+
+def compare(baseline, current):
+    """Rows of (templates, stage, baseline_min, current_min, ratio) for scales present in both reports"""
+    baseline_by_scale = {result['templates']: result['stages'] for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = baseline_by_scale.get(result['templates'])
+        if before is None:
+            continue
+        for stage, timing in result['stages'].items():
+            if stage in before:
+                ratio = timing['min'] / before[stage]['min'] if before[stage]['min'] else float('inf')
+                rows.append((result['templates'], stage, before[stage]['min'], timing['min'], ratio))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help="template (and client) counts to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage; min and median are reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--output', default=None, help="write the JSON report here instead of stdout")
+    parser.add_argument('--compare', default=None, help="baseline JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.scales, args.repeat, args.seed, args.top_k, log=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        print(f"compared with {baseline.get('commit')}:", file=sys.stderr)
+        for n_templates, stage, before, after, ratio in compare(baseline, report):
+            print(f"{n_templates:>8} {stage:<34} {before:.4f}s -> {after:.4f}s ({ratio:.2f}x)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# benchmarks/search_load.py
+"""Load generator for the micro-batching search service.
+
+Drives POST /search from many concurrent keep-alive connections and reports
+throughput and p50/p95/p99 latency as JSON. Without --url it starts an
+in-process service on synthetic sheets (with the offline hashing encoder)
+once per --max-batch-size value, so batched and unbatched serving can be
+compared directly:
+
+    python -m benchmarks.search_load --templates 5000 --concurrency 32 --max-batch-size 1 32
+    python -m benchmarks.search_load --url http://127.0.0.1:8765 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.pipeline_benchmark import QUERIES, HashingEncoder
+from benchmarks.synthetic import INDUSTRIES, KEYWORDS, NICHES, InMemoryDataLoader, generate_sheets
+
+
+def query_stream(seed=0):
+    """Endless, mostly-distinct queries so the result cache does not answer everything"""
+    rng = np.random.default_rng(seed)
+    vocabulary = INDUSTRIES + KEYWORDS + NICHES
+    while True:
+        words = [vocabulary[i] for i in rng.integers(0, len(vocabulary), size=rng.integers(1, 4))]
+        yield f"{QUERIES[rng.integers(0, len(QUERIES))]} {' '.join(words)}".lower()
+
+
+async def _post(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def generate_load(url, n_requests=1000, concurrency=16, top_k=20, seed=0):
+    """Send ``n_requests`` searches over ``concurrency`` connections; returns the latency report"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    queries = query_stream(seed)
+    remaining = [n_requests]
+    latencies = []
+    errors = [0]
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                start = time.perf_counter()
+                status = await _post(reader, writer, parts.netloc, '/search', {'query': next(queries), 'top_k': top_k})
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors[0] += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            'mean': float(latencies_ms.mean()),
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p95': float(np.percentile(latencies_ms, 95)),
+            'p99': float(np.percentile(latencies_ms, 99)),
+            'max': float(latencies_ms.max()),
+        },
+    }
+
+
+async def run_in_process(n_templates, max_batch_size, max_wait_ms, n_requests, concurrency, top_k, seed):
+    """Start a local service on synthetic data, load it, and add its batching stats to the report"""
+    from finder import TemplateFinder
+    from search_service import SearchService
+
+    template_finder = TemplateFinder(
+        InMemoryDataLoader(*generate_sheets(n_templates, seed=seed)), sentence_model=HashingEncoder(seed=seed)
+    )
+    template_finder.build_index()
+    service = await SearchService(
+        template_finder, host='127.0.0.1', port=0, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+    ).start()
+    try:
+        report = await generate_load(f"http://127.0.0.1:{service.port}", n_requests, concurrency, top_k, seed)
+    finally:
+        await service.stop()
+    report['templates'] = n_templates
+    report['batching'] = service.batcher.stats()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=None, help="load an already running service instead of a local one")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--templates', type=int, default=5000, help="synthetic templates for the local service")
+    parser.add_argument('--max-batch-size', type=int, nargs='+', default=[1, 32],
+                        help="local service batch sizes to compare (1 disables batching)")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        reports = [asyncio.run(generate_load(args.url, args.requests, args.concurrency, args.top_k, args.seed))]
+    else:
+        reports = [
+            asyncio.run(run_in_process(
+                args.templates, batch_size, args.max_wait_ms, args.requests, args.concurrency, args.top_k, args.seed
+            ))
+            for batch_size in args.max_batch_size
+        ]
+    print(json.dumps(reports, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
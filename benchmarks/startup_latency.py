@@ -0,0 +1,63 @@
+# benchmarks/startup_latency.py
+"""Measure import, construction and first-query latency of TemplateFinder.
+
+Reports how long the search box is unusable after startup with the model
+loading in the background (default) or synchronously (--eager):
+
+    python -m benchmarks.startup_latency --templates 500
+"""
+import argparse
+import json
+import time
+
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+
+
+def measure(n_templates, eager=False, query='fashion'):
+    """Return a dict of startup latencies in seconds"""
+    report = {'templates': n_templates, 'eager': eager}
+    sheets = generate_sheets(n_templates, seed=0)
+
+    start = time.perf_counter()
+    from finder import TemplateFinder
+    report['import_finder'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    template_finder = TemplateFinder(InMemoryDataLoader(*sheets), load_model_async=not eager)
+    report['construct'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    template_finder.build_index()
+    report['build_index'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = template_finder.find_similar_templates(query)
+    report['first_query'] = time.perf_counter() - start
+    report['first_query_mode'] = results.attrs.get('search_mode')
+    report['time_to_first_result'] = report['construct'] + report['build_index'] + report['first_query']
+
+    start = time.perf_counter()
+    template_finder.wait_for_model()
+    # The loader thread re-indexes with embeddings right after the model is ready
+    while template_finder.search_mode() != 'hybrid' and template_finder.sentence_model is not None:
+        time.sleep(0.01)
+    report['wait_for_hybrid'] = time.perf_counter() - start
+    report['model_load'] = template_finder.model_load_seconds
+
+    start = time.perf_counter()
+    results = template_finder.find_similar_templates(query + ' campaign')
+    report['first_hybrid_query'] = time.perf_counter() - start
+    report['hybrid_query_mode'] = results.attrs.get('search_mode')
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--templates', type=int, default=500)
+    parser.add_argument('--eager', action='store_true', help="load the model synchronously in the constructor")
+    args = parser.parse_args()
+    print(json.dumps(measure(args.templates, eager=args.eager), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/synthetic.py
+import numpy as np
+import pandas as pd
+
+INDUSTRIES = [
+    'Fashion', 'Automotive', 'Gaming', 'Retail', 'Travel', 'Banking', 'Insurance', 'Telecom',
+    'Beauty', 'Healthcare', 'Pharma', 'Education', 'Food & Beverage', 'Real Estate', 'Media',
+    'Sports', 'Electronics', 'Luxury', 'FMCG', 'Entertainment',
+]
+NICHES = [
+    'sneakers', 'ev', 'esports', 'quick commerce', 'budget airlines', 'credit cards', 'term life',
+    'prepaid plans', 'skincare', 'diagnostics', 'otc', 'edtech', 'snacks', 'luxury homes', 'ott',
+    'cricket', 'smartphones', 'watches', 'detergents', 'live events',
+]
+FOCUS = [
+    'brand awareness', 'lead generation', 'app installs', 'store visits', 'retargeting',
+    'product launch', 'festive sale', 'video views', 'engagement', 'conversions',
+]
+KEYWORDS = [
+    'weather', 'cricket score', 'countdown', 'location', 'dynamic pricing', 'catalog', 'carousel',
+    'interactive', 'video', 'gamified', 'quiz', 'scratch card', 'trivia', 'store locator',
+    'weather trigger', 'time of day', 'personalised', 'shoppable', 'rich media', 'native',
+]
+FORMATS = ['Banner', 'Carousel', 'Video', 'Scratch Card', 'Quiz', 'Countdown', 'Store Locator', 'Cube']
+SYLLABLES = ['no', 'ka', 'zu', 'ri', 'vo', 'la', 'mi', 'ta', 'ser', 'lex', 'dor', 'pix', 'qua', 'ben']
+
+
+def _pick(rng, options, size, k):
+    """Comma-separated phrases drawn from ``options``, one string per row"""
+    picks = rng.integers(0, len(options), size=(size, k))
+    return [', '.join(options[i] for i in row) for row in picks]
+
+
+def client_names(n_clients, seed=0):
+    """Deterministic, mostly-unique brand-like client names"""
+    rng = np.random.default_rng(seed)
+    names = []
+    seen = set()
+    while len(names) < n_clients:
+        length = rng.integers(2, 4)
+        name = ''.join(SYLLABLES[i] for i in rng.integers(0, len(SYLLABLES), size=length)).title()
+        if name in seen:
+            name = f"{name}{len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def generate_sheets(n_templates, n_clients=None, tags_per_template=3, seed=0):
+    """Build (client_profiles, template_tags, template_details) shaped like the live sheets"""
+    n_clients = n_clients or n_templates
+    rng = np.random.default_rng(seed)
+    names = client_names(n_clients, seed)
+
+    client_profiles = pd.DataFrame({
+        'client_type': [f"{name} {rng.choice(['Brand', 'India', 'Group', 'Ltd'])}" for name in names],
+        'keywords': _pick(rng, KEYWORDS, n_clients, 3),
+        'domain_url': [f"https://www.{name.lower()}.com" for name in names],
+        'industry': [INDUSTRIES[i] for i in rng.integers(0, len(INDUSTRIES), n_clients)],
+        'business_niche': _pick(rng, NICHES, n_clients, 1),
+        'marketing_focus': _pick(rng, FOCUS, n_clients, 2),
+        'relevant_keywords': _pick(rng, KEYWORDS + NICHES, n_clients, 4),
+    })
+
+    template_names = [
+        f"{FORMATS[i % len(FORMATS)]} {INDUSTRIES[(i // len(FORMATS)) % len(INDUSTRIES)]} {i}"
+        for i in range(n_templates)
+    ]
+    template_details = pd.DataFrame({
+        'template_name': template_names,
+        'description': [
+            f"{fmt} unit for {niche} with {kw}"
+            for fmt, niche, kw in zip(
+                _pick(rng, FORMATS, n_templates, 1),
+                _pick(rng, NICHES, n_templates, 1),
+                _pick(rng, KEYWORDS, n_templates, 2),
+            )
+        ],
+        'avg_ctr': np.round(rng.gamma(2.0, 0.6, n_templates), 2),
+        'preview_url': [f"https://preview.hockeycurve.com/t/{i}" for i in range(n_templates)],
+    })
+
+    n_tags = n_templates * tags_per_template
+    template_tags = pd.DataFrame({
+        'campaign_name': [f"Campaign {i}" for i in range(n_tags)],
+        'client_name': [names[i] for i in rng.integers(0, n_clients, n_tags)],
+        'template_name': [template_names[i] for i in rng.integers(0, n_templates, n_tags)],
+        'preview_url': [f"https://preview.hockeycurve.com/c/{i}" for i in range(n_tags)],
+    })
+
+    return client_profiles, template_tags, template_details
+
+
+class InMemoryDataLoader:
+    """DataLoader stand-in serving fixed DataFrames without touching Google Sheets"""
+
+    def __init__(self, client_profiles, template_tags, template_details):
+        self.client_profiles = client_profiles
+        self.template_tags = template_tags
+        self.template_details = template_details
+
+    def get_client_profiles(self):
+        return self.client_profiles
+
+    def get_template_tags(self):
+        return self.template_tags
+
+    def get_template_details(self):
+        return self.template_details
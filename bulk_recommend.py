@@ -0,0 +1,160 @@
+# bulk_recommend.py
+"""Offline bulk recommendations for a file of client briefs.
+
+Streams queries from a CSV or JSONL file in fixed-size chunks, scores each
+chunk with TemplateFinder.find_similar_templates_batch and appends the ranked
+templates to the output file, so memory stays bounded for any input length.
+
+    python bulk_recommend.py briefs.csv results.csv --query-column brief --top-k 10
+    python bulk_recommend.py briefs.csv results.csv --industry Automotive --min-avg-ctr 1.5
+"""
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+from data_loader import DataLoader
+from embedding_backend import BACKENDS, cache_model_name
+from embedding_cache import DEFAULT_CACHE_DIR, EmbeddingCache
+from embedding_matrix import STORAGE_DTYPES
+from finder import TemplateFinder
+
+
+def file_format(path):
+    """Infer 'csv' or 'jsonl' from a file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Unsupported file type '{extension}', expected .csv or .jsonl")
+
+
+def read_query_chunks(path, chunk_size):
+    """Yield the input file as DataFrames of at most ``chunk_size`` rows"""
+    if file_format(path) == 'csv':
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    else:
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def recommend_chunk(template_finder, chunk, query_column, id_column=None, top_k=20, offset=0, filters=None):
+    """Score one chunk of queries, returning (query_id, query, recommendations) per row"""
+    if query_column not in chunk.columns:
+        raise ValueError(f"Query column '{query_column}' not found in input")
+
+    queries = chunk[query_column].fillna('').astype(str).tolist()
+    if id_column:
+        query_ids = chunk[id_column].tolist()
+    else:
+        query_ids = list(range(offset, offset + len(queries)))
+
+    results = template_finder.find_similar_templates_batch(queries, top_k=top_k, filters=filters)
+    return list(zip(query_ids, queries, results))
+
+
+def write_csv_rows(handle, scored, header):
+    """Append one flat row per (query, recommended template) to a CSV file"""
+    frames = []
+    for query_id, query, recommendations in scored:
+        if recommendations.empty:
+            continue
+        frame = recommendations.copy()
+        frame.insert(0, 'rank', range(1, len(frame) + 1))
+        frame.insert(0, 'query', query)
+        frame.insert(0, 'query_id', query_id)
+        frames.append(frame)
+
+    if not frames:
+        return header
+    pd.concat(frames, ignore_index=True).to_csv(handle, header=header, index=False)
+    return False
+
+
+def write_jsonl_rows(handle, scored):
+    """Append one JSON object per query with its ranked recommendations"""
+    for query_id, query, recommendations in scored:
+        record = {
+            'query_id': query_id,
+            'query': query,
+            'results': json.loads(recommendations.to_json(orient='records')) if not recommendations.empty else [],
+        }
+        handle.write(json.dumps(record, default=str) + '\n')
+
+
+def run(template_finder, input_path, output_path, query_column='query', id_column=None,
+        top_k=20, chunk_size=256, filters=None):
+    """Stream ``input_path`` through the finder into ``output_path``; returns the number of queries"""
+    output_format = file_format(output_path)
+    processed = 0
+    header = True
+
+    with open(output_path, 'w', encoding='utf-8', newline='') as handle:
+        for chunk in read_query_chunks(input_path, chunk_size):
+            scored = recommend_chunk(
+                template_finder, chunk, query_column, id_column, top_k, offset=processed, filters=filters
+            )
+            if output_format == 'csv':
+                header = write_csv_rows(handle, scored, header)
+            else:
+                write_jsonl_rows(handle, scored)
+            processed += len(chunk)
+            print(f"Processed {processed} queries", file=sys.stderr)
+
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk template recommendations for a CSV/JSONL file of queries")
+    parser.add_argument('input', help="input .csv or .jsonl file with one query per row")
+    parser.add_argument('output', help="output .csv (one row per recommendation) or .jsonl (one line per query)")
+    parser.add_argument('--query-column', default='query', help="column/field holding the query text")
+    parser.add_argument('--id-column', default=None, help="column/field to carry through as query_id")
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--chunk-size', type=int, default=256, help="queries scored per batch")
+    parser.add_argument('--credentials', default=None, help="service account JSON key (defaults to Streamlit secrets)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="embedding cache directory")
+    parser.add_argument('--backend', default='float32', choices=sorted(BACKENDS), help="query/template encoder")
+    parser.add_argument('--threads', type=int, default=None, help="torch CPU threads for encoding")
+    parser.add_argument('--embedding-dtype', default='float32', choices=STORAGE_DTYPES,
+                        help="storage type of the template embedding matrix")
+    parser.add_argument('--retrieval', default='full', choices=TemplateFinder.RETRIEVAL_MODES,
+                        help="score every template, or re-rank sparse candidates only")
+    parser.add_argument('--cascade-candidates', type=int, default=TemplateFinder.CASCADE_CANDIDATES,
+                        help="templates re-ranked per query with --retrieval cascade")
+    parser.add_argument('--industry', nargs='+', default=None, help="only templates for these industries")
+    parser.add_argument('--client', nargs='+', default=None, help="only templates used by these clients")
+    parser.add_argument('--business-niche', nargs='+', default=None, help="only templates for these niches")
+    parser.add_argument('--min-avg-ctr', type=float, default=None, help="only templates with at least this CTR")
+    args = parser.parse_args(argv)
+
+    data_loader = DataLoader()
+    if not data_loader.authenticate_gspread(args.credentials) or not data_loader.load_data():
+        print("Failed to load data from Google Sheets", file=sys.stderr)
+        return 1
+
+    embedding_cache = EmbeddingCache(args.cache_dir, cache_model_name(TemplateFinder.MODEL_NAME, args.backend))
+    template_finder = TemplateFinder(
+        data_loader, embedding_cache=embedding_cache, load_model_async=False,
+        embedding_backend=args.backend, num_threads=args.threads, embedding_dtype=args.embedding_dtype,
+        retrieval=args.retrieval, cascade_candidates=args.cascade_candidates,
+    )
+    template_finder.build_index()
+
+    filters = {
+        'industry': args.industry, 'client': args.client,
+        'business_niche': args.business_niche, 'min_avg_ctr': args.min_avg_ctr,
+    }
+    run(template_finder, args.input, args.output, args.query_column, args.id_column,
+        args.top_k, args.chunk_size, filters)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# catalog.py
+import numpy as np
+import pandas as pd
+
+from text_matching import REGEX_SPECIAL
+
+# Columns of the recommendations dataframe rendered by app.py, in order
+RESULT_COLUMNS = ['Template Name', 'Description', 'Similarity Score', 'Open Preview', 'avg_ctr', 'Associated Clients']
+
+
+class TemplateCatalog:
+    """Column arrays for every indexed template, addressed by integer template id.
+
+    Template ids are the row positions of the search index, so ranking output
+    can be turned into result rows with array gathers instead of dataframe scans.
+    Built once per data load from the template info and the two template sheets.
+    """
+
+    def __init__(self, template_info, template_details, template_tags):
+        names = [info['template_name'] for info in template_info]
+        self.names = np.array(names, dtype=object)
+        self.name_to_id = {name: template_id for template_id, name in enumerate(names)}
+
+        # First details row per template, as the per-result mask scan used to pick
+        details = template_details.drop_duplicates('template_name').set_index('template_name')
+        self.has_detail = pd.Index(names).isin(details.index) & pd.notna(self.names)
+        details = details.reindex(names)
+        self.description = details['description'].to_numpy(dtype=object)
+        if 'avg_ctr' in details.columns:
+            self.avg_ctr = details['avg_ctr'].to_numpy(dtype=object)
+        else:
+            self.avg_ctr = np.full(len(names), 'N/A', dtype=object)
+
+        # Preview URL from the first tags row per template, "" when it has none
+        tags = template_tags.drop_duplicates('template_name').set_index('template_name')
+        has_tag = pd.Index(names).isin(tags.index)
+        if 'preview_url' in tags.columns:
+            preview_url = tags['preview_url'].reindex(names).to_numpy(dtype=object)
+        else:
+            preview_url = np.full(len(names), "", dtype=object)
+        self.preview_url = np.where(has_tag, preview_url, "")
+
+        self.associated_clients = np.array(
+            [', '.join(map(str, info['associated_clients'])) for info in template_info], dtype=object
+        )
+
+        self._build_client_index(template_details, template_tags)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _build_client_index(self, template_details, template_tags):
+        """Pre-join tags with details and index the joined rows by client name"""
+        tags = template_tags.reset_index(drop=True)
+        tag_rows = np.arange(len(tags))
+        merged = pd.merge(tags.assign(_tag_row=tag_rows), template_details, on='template_name', how='left')
+
+        # Left-merge output keeps tag order, so each tag row owns a contiguous block
+        self.tag_offsets = np.searchsorted(merged['_tag_row'].to_numpy(), np.arange(len(tags) + 1))
+        self.tags_with_details = merged.drop(columns='_tag_row')
+
+        self.client_to_tag_rows = {}
+        if 'client_name' in tags.columns:
+            for client, rows in tags.groupby('client_name', sort=False).indices.items():
+                if isinstance(client, str):
+                    self.client_to_tag_rows[client] = rows
+        self._client_keys = list(self.client_to_tag_rows)
+        self._client_keys_lower = [client.lower() for client in self._client_keys]
+
+    def ids_for_names(self, template_names):
+        """Template ids for the given names, skipping unknown names"""
+        return np.array(
+            [self.name_to_id[name] for name in template_names if name in self.name_to_id], dtype=np.intp
+        )
+
+    def matching_clients(self, client_name):
+        """Client names containing ``client_name`` with str.contains(case=False) semantics"""
+        if client_name.isascii() and not REGEX_SPECIAL.search(client_name):
+            needle = client_name.lower()
+            return [key for key, lower in zip(self._client_keys, self._client_keys_lower) if needle in lower]
+
+        mask = pd.Series(self._client_keys, dtype=object).str.contains(client_name, case=False, na=False)
+        return [key for key, matched in zip(self._client_keys, mask) if matched]
+
+    def templates_for_client(self, client_name):
+        """Tags rows of matching clients joined with their template details"""
+        clients = self.matching_clients(client_name)
+        if not clients:
+            return self.tags_with_details.iloc[0:0].reset_index(drop=True)
+
+        tag_rows = np.sort(np.concatenate([self.client_to_tag_rows[client] for client in clients]))
+        positions = np.concatenate([
+            np.arange(self.tag_offsets[row], self.tag_offsets[row + 1]) for row in tag_rows
+        ])
+        return self.tags_with_details.iloc[positions].reset_index(drop=True)
+
+    def results(self, template_ids, similarities):
+        """Recommendation rows for ranked template ids, keeping positive scores with details"""
+        template_ids = np.asarray(template_ids, dtype=np.intp)
+        return self.results_for_scores(template_ids, np.asarray(similarities)[template_ids])
+
+    def results_for_scores(self, template_ids, scores):
+        """Like results, with ``scores`` aligned to ``template_ids`` rather than covering the catalog"""
+        template_ids = np.asarray(template_ids, dtype=np.intp)
+        scores = np.asarray(scores)
+        keep = (scores > 0) & self.has_detail[template_ids]
+        template_ids = template_ids[keep]
+
+        if len(template_ids) == 0:
+            return pd.DataFrame()
+
+        return pd.DataFrame({
+            'Template Name': self.names[template_ids],
+            'Description': self.description[template_ids],
+            'Similarity Score': np.round(scores[keep] * 100, 2),
+            'Open Preview': self.preview_url[template_ids],
+            'avg_ctr': self.avg_ctr[template_ids],
+            'Associated Clients': self.associated_clients[template_ids],
+        }, columns=RESULT_COLUMNS).infer_objects()
@@ -1,12 +1,41 @@
 # data_loader.py
+import hashlib
+import json
+import logging
+import os
+import shutil
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import gspread
+import requests
+from gspread.utils import numericise_all
 from google.oauth2.service_account import Credentials
 import streamlit as st
+from instrumentation import NULL_INSTRUMENTATION
+
+logger = logging.getLogger(__name__)
+
+# Attribute name -> worksheet title
+SHEET_NAMES = {
+    'client_profiles': 'Client_Profiles',
+    'template_tags': 'Template_Tags_and_Previews',
+    'template_details': 'Template_Details',
+}
+
+DEFAULT_SNAPSHOT_DIR = '.cache/sheets'
+
+# HTTP statuses worth retrying: quota exhaustion and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
 
 class DataLoader:
-    def __init__(self):
-        self.gc = None
+    def __init__(self, gc=None, snapshot_dir=None, max_staleness=None, refresh_interval=300,
+                 fetch_mode='batch', max_retries=4, retry_base_delay=1.0, instrumentation=None):
+        self.gc = gc
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
         self.client_profiles = None
         self.template_tags = None
         self.template_details = None
@@ -14,16 +43,42 @@ class DataLoader:
         # Configuration
         self.SPREADSHEET_ID = "1WaY3H_T8rAtHvLSmJ_MvqVvzy5MEaEqLbdUxDeVh228"
         
+        # Local snapshot: served immediately on startup, revalidated in the background.
+        # max_staleness (seconds) is the oldest snapshot served without a blocking fetch.
+        self.snapshot_dir = snapshot_dir
+        self.max_staleness = max_staleness
+        self.refresh_interval = refresh_interval
+        self.data_version = None
+        self.fetched_at = None
+        self.last_refresh_error = None
+        # Rows added/removed per sheet by the last refresh that changed the data
+        self.last_diff = None
+        
+        # Fetching: 'batch' reads every sheet in one values:batchGet request,
+        # 'concurrent' reads them in parallel; both retry transient API errors
+        self.fetch_mode = fetch_mode
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.fetch_timings = {}
+        
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._listeners = []
+    
     def authenticate_gspread(self, credentials_path=None):
         """Authenticate with Google Sheets API"""
         try:
             scope = ['https://spreadsheets.google.com/feeds',
                     'https://www.googleapis.com/auth/drive']
             
-            # Use Streamlit secrets when deployed
-            creds = Credentials.from_service_account_info(
-                st.secrets["gcp_service_account"], scopes=scope
-            )
+            if credentials_path:
+                # Service account key file, e.g. for offline/CLI use
+                creds = Credentials.from_service_account_file(credentials_path, scopes=scope)
+            else:
+                # Use Streamlit secrets when deployed
+                creds = Credentials.from_service_account_info(
+                    st.secrets["gcp_service_account"], scopes=scope
+                )
             self.gc = gspread.authorize(creds)
             return True
         except Exception as e:
@@ -31,25 +86,15 @@ class DataLoader:
             return False
     
     def load_data(self):
-        """Load data from Google Sheets"""
+        """Load data, serving a fresh-enough local snapshot first when one exists"""
         try:
-            # Open the spreadsheet
-            spreadsheet = self.gc.open_by_key(self.SPREADSHEET_ID)
-            
-            # Load Client Profiles
-            client_sheet = spreadsheet.worksheet("Client_Profiles")
-            client_data = client_sheet.get_all_records()
-            self.client_profiles = pd.DataFrame(client_data)
-            
-            # Load Template Tags and Previews
-            template_tags_sheet = spreadsheet.worksheet("Template_Tags_and_Previews")
-            template_tags_data = template_tags_sheet.get_all_records()
-            self.template_tags = pd.DataFrame(template_tags_data)
-            
-            # Load Template Details
-            template_details_sheet = spreadsheet.worksheet("Template_Details")
-            template_details_data = template_details_sheet.get_all_records()
-            self.template_details = pd.DataFrame(template_details_data)
+            if self.snapshot_dir and self._load_snapshot() and not self.is_stale():
+                # Serve the snapshot now and revalidate against Sheets in the background
+                self._validate_data()
+                self.refresh_async()
+                return True
+                
+            self.refresh()
             
             # Basic data validation
             self._validate_data()
@@ -60,17 +105,227 @@ class DataLoader:
             st.error(f"Error loading data: {str(e)}")
             return False
     
+    def _fetch_frames(self):
+        """Fetch every worksheet from Google Sheets, recording per-step timings in fetch_timings"""
+        with self.instrumentation.stage('fetch_sheets', component='data_loader', fetch_mode=self.fetch_mode) as stage:
+            frames = self._fetch_frames_timed()
+            stage.count(**{f"{name}_rows": len(frame) for name, frame in frames.items()})
+            stage.count(**{f"fetch.{step}": seconds for step, seconds in self.fetch_timings.items()})
+        return frames
+    
+    def _fetch_frames_timed(self):
+        timings = {}
+        
+        # Open the spreadsheet
+        start = time.perf_counter()
+        spreadsheet = self._with_retries(self.gc.open_by_key, self.SPREADSHEET_ID)
+        timings['open_spreadsheet'] = time.perf_counter() - start
+        
+        if self.fetch_mode == 'concurrent':
+            values = self._fetch_values_concurrently(spreadsheet, timings)
+        else:
+            values = self._fetch_values_batched(spreadsheet, timings)
+        
+        frames = {}
+        for name, title in SHEET_NAMES.items():
+            start = time.perf_counter()
+            frames[name] = _arrow_safe(_frame_from_values(values[title]))
+            timings[f"{title}.parse"] = time.perf_counter() - start
+        
+        self.fetch_timings = timings
+        return frames
+    
+    def _fetch_values_batched(self, spreadsheet, timings):
+        """Read every sheet's values in a single values:batchGet request"""
+        titles = list(SHEET_NAMES.values())
+        ranges = ["'{}'".format(title.replace("'", "''")) for title in titles]
+        
+        start = time.perf_counter()
+        response = self._with_retries(spreadsheet.values_batch_get, ranges)
+        timings['values_batch_get'] = time.perf_counter() - start
+        
+        value_ranges = response.get('valueRanges', [])
+        return {
+            title: (value_ranges[i].get('values', []) if i < len(value_ranges) else [])
+            for i, title in enumerate(titles)
+        }
+    
+    def _fetch_values_concurrently(self, spreadsheet, timings):
+        """Read every sheet's values on a thread pool, one request per sheet"""
+        def fetch(title):
+            start = time.perf_counter()
+            values = self._with_retries(lambda: spreadsheet.worksheet(title).get_all_values())
+            return values, time.perf_counter() - start
+        
+        titles = list(SHEET_NAMES.values())
+        with ThreadPoolExecutor(max_workers=len(titles)) as pool:
+            results = dict(zip(titles, pool.map(fetch, titles)))
+        
+        values = {}
+        for title, (sheet_values, elapsed) in results.items():
+            values[title] = sheet_values
+            timings[f"{title}.fetch"] = elapsed
+        return values
+    
+    def _with_retries(self, fn, *args):
+        """Call ``fn`` and retry transient Sheets failures with exponential backoff and jitter"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(*args)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_transient(e):
+                    raise
+                delay = self.retry_base_delay * (2 ** attempt) * (0.5 + random.random() / 2)
+                logger.warning("Transient Sheets error (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+    
+    def refresh(self):
+        """Re-fetch from Sheets and swap the new data in if it changed; returns True on change"""
+        with self.instrumentation.stage('refresh', component='data_loader') as stage:
+            frames = self._fetch_frames()
+            with self.instrumentation.stage('hash_data', component='data_loader'):
+                version = data_version(frames)
+            fetched_at = time.time()
+            
+            changed = version != self.data_version
+            stage.count(changed=changed)
+            if changed:
+                self.last_diff = {
+                    name: row_diff(getattr(self, name), frame) for name, frame in frames.items()
+                }
+                stage.count(**{
+                    f"{name}_{kind}": diff[kind]
+                    for name, diff in self.last_diff.items() for kind in ('added', 'removed')
+                })
+                self._swap(frames, version, fetched_at)
+            else:
+                self.fetched_at = fetched_at
+                
+            if self.snapshot_dir:
+                with self.instrumentation.stage('write_snapshot', component='data_loader'):
+                    self._write_snapshot(frames, version, fetched_at)
+            
+        if changed:
+            for listener in list(self._listeners):
+                listener(self)
+        return changed
+    
+    def refresh_async(self):
+        """Start a background refresh unless one is already running"""
+        with self._lock:
+            if self.is_refreshing():
+                return self._refresh_thread
+            self._refresh_thread = threading.Thread(
+                target=self._background_refresh, name='sheets-refresh', daemon=True
+            )
+            self._refresh_thread.start()
+            return self._refresh_thread
+    
+    def is_refreshing(self):
+        """Whether a background refresh is in progress"""
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+    
+    def _background_refresh(self):
+        try:
+            self.refresh()
+            self.last_refresh_error = None
+        except Exception as e:
+            # Keep serving the current data; the next refresh will retry
+            self.last_refresh_error = e
+            logger.warning("Background Sheets refresh failed: %s", e)
+    
+    def maybe_refresh(self):
+        """Revalidate in the background once the data is older than refresh_interval"""
+        if self.fetched_at is None or self.refresh_interval is None:
+            return None
+        if time.time() - self.fetched_at >= self.refresh_interval:
+            return self.refresh_async()
+        return None
+    
+    def is_stale(self):
+        """Whether the current data is older than max_staleness"""
+        if self.fetched_at is None:
+            return True
+        if self.max_staleness is None:
+            return False
+        return time.time() - self.fetched_at > self.max_staleness
+    
+    def add_listener(self, callback):
+        """Call ``callback(data_loader)`` after new data has been swapped in"""
+        self._listeners.append(callback)
+    
+    def _swap(self, frames, version, fetched_at):
+        """Replace all three frames and the version stamp together"""
+        with self._lock:
+            self.client_profiles = frames['client_profiles']
+            self.template_tags = frames['template_tags']
+            self.template_details = frames['template_details']
+            self.data_version = version
+            self.fetched_at = fetched_at
+    
+    def frames(self):
+        """(client_profiles, template_tags, template_details, data_version) from one consistent swap"""
+        with self._lock:
+            return self.client_profiles, self.template_tags, self.template_details, self.data_version
+    
+    def _snapshot_manifest(self):
+        return os.path.join(self.snapshot_dir, 'snapshot.json')
+    
+    def _load_snapshot(self):
+        """Load the latest local snapshot; returns False if there is none or it is unreadable"""
+        try:
+            with self.instrumentation.stage('load_snapshot', component='data_loader'):
+                with open(self._snapshot_manifest(), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                snapshot_path = os.path.join(self.snapshot_dir, manifest['path'])
+                frames = {
+                    name: pd.read_parquet(os.path.join(snapshot_path, f"{name}.parquet"))
+                    for name in SHEET_NAMES
+                }
+                version, fetched_at = manifest['version'], manifest['fetched_at']
+        except (OSError, ValueError, KeyError) as e:
+            logger.info("No usable sheets snapshot: %s", e)
+            return False
+            
+        self._swap(frames, version, fetched_at)
+        return True
+    
+    def _write_snapshot(self, frames, version, fetched_at):
+        """Write the frames to a new snapshot directory, then atomically repoint the manifest"""
+        try:
+            dirname = f"v-{version[:16]}"
+            snapshot_path = os.path.join(self.snapshot_dir, dirname)
+            if not os.path.isdir(snapshot_path):
+                tmp_path = snapshot_path + '.tmp'
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                os.makedirs(tmp_path)
+                for name, frame in frames.items():
+                    frame.to_parquet(os.path.join(tmp_path, f"{name}.parquet"), index=False)
+                os.replace(tmp_path, snapshot_path)
+            
+            tmp_manifest = self._snapshot_manifest() + '.tmp'
+            with open(tmp_manifest, 'w', encoding='utf-8') as f:
+                json.dump({'version': version, 'fetched_at': fetched_at, 'path': dirname}, f)
+            os.replace(tmp_manifest, self._snapshot_manifest())
+            
+            # Drop superseded snapshot directories
+            for entry in os.listdir(self.snapshot_dir):
+                if entry.startswith('v-') and entry != dirname:
+                    shutil.rmtree(os.path.join(self.snapshot_dir, entry), ignore_errors=True)
+        except Exception as e:
+            logger.warning("Could not write sheets snapshot: %s", e)
+    
     def _validate_data(self):
         """Validate that required columns exist in the data"""
-        required_client_cols = ['client_type', 'keywords', 'domain_url', 'industry', 
+        required_client_cols = ['client_type', 'keywords', 'domain_url', 'industry',
                                'business_niche', 'marketing_focus', 'relevant_keywords']
         if not all(col in self.client_profiles.columns for col in required_client_cols):
             st.warning("One or more required columns are missing in 'Client_Profiles'.")
-
+            
         required_tags_cols = ['campaign_name', 'client_name', 'template_name']
         if not all(col in self.template_tags.columns for col in required_tags_cols):
             st.warning("One or more required columns are missing in 'Template_Tags_and_Previews'.")
-
+            
         required_details_cols = ['template_name', 'description', 'avg_ctr', 'preview_url']
         if not all(col in self.template_details.columns for col in required_details_cols):
             st.warning("One or more required columns are missing in 'Template_Details'.")
@@ -83,3 +338,74 @@ class DataLoader:
     
     def get_template_details(self):
         return self.template_details
+
+
+def _frame_from_values(values):
+    """Build a DataFrame from a sheet's raw value rows the way get_all_records reads them.
+
+    The first row is the header, rows are padded to the widest row and cells
+    are numericised, but the rows go straight into the frame without being
+    turned into one dict per record.
+    """
+    if len(values) < 2:
+        return pd.DataFrame()
+    
+    width = max(len(row) for row in values)
+    header = list(values[0]) + [''] * (width - len(values[0]))
+    duplicates = [key for key, count in Counter(header).items() if count > 1]
+    if duplicates:
+        # The same error get_all_records raises, so callers see no difference
+        raise gspread.exceptions.GSpreadException(
+            f"the header row in the worksheet contains duplicates: {duplicates}"
+        )
+    
+    rows = [numericise_all(list(row) + [''] * (width - len(row))) for row in values[1:]]
+    return pd.DataFrame(rows, columns=header)
+
+
+def _is_transient(error):
+    """Whether a Sheets failure is worth retrying"""
+    if isinstance(error, gspread.exceptions.APIError):
+        return getattr(error, 'code', None) in RETRYABLE_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError, requests.exceptions.ConnectionError,
+                              requests.exceptions.Timeout))
+
+
+def _arrow_safe(frame):
+    """Stringify object columns that mix value types (e.g. numbers and '' from empty cells).
+
+    Downstream code only ever formats these values with str(), and Parquet
+    needs one type per column.
+    """
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype == object:
+            types = {type(value) for value in values if value is not None}
+            if len(types) > 1:
+                frame[column] = values.map(lambda value: value if value is None else str(value))
+    return frame
+
+
+def row_diff(old, new):
+    """Count rows added and removed between two versions of a sheet, comparing whole rows"""
+    if old is None or list(old.columns) != list(new.columns):
+        return {'added': len(new), 'removed': 0 if old is None else len(old), 'rows': len(new)}
+    
+    old_hashes = Counter(pd.util.hash_pandas_object(old, index=False).tolist())
+    new_hashes = Counter(pd.util.hash_pandas_object(new, index=False).tolist())
+    return {
+        'added': sum((new_hashes - old_hashes).values()),
+        'removed': sum((old_hashes - new_hashes).values()),
+        'rows': len(new),
+    }
+
+
+def data_version(frames):
+    """Content hash of the sheet frames, used as the data version stamp"""
+    digest = hashlib.sha1()
+    for name in sorted(frames):
+        frame = frames[name]
+        digest.update(name.encode('utf-8'))
+        digest.update(json.dumps([str(column) for column in frame.columns]).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
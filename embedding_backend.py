@@ -0,0 +1,76 @@
+# embedding_backend.py
+"""Sentence-embedding backends for TemplateFinder.
+
+A backend is anything with ``encode(texts) -> array``. 'float32' is the plain
+SentenceTransformer on CPU. 'int8' applies PyTorch dynamic quantization to the
+model's Linear layers, so weights are stored as int8 and activations are
+quantized on the fly. That usually cuts query-encoding latency on CPU-only
+hosts at a small cost in ranking agreement. Use
+TemplateFinder.check_backend_agreement to check that cost before switching.
+"""
+import numpy as np
+
+from search_index import top_k_indices
+
+
+class SentenceTransformerBackend:
+    """Full-precision SentenceTransformer on CPU"""
+
+    name = 'float32'
+
+    def __init__(self, model_name, num_threads=None):
+        # Deferred so importing this module does not pull in torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self.model = SentenceTransformer(model_name, device='cpu')
+
+    def encode(self, texts, **kwargs):
+        return self.model.encode(texts, convert_to_numpy=True, **kwargs)
+
+
+class QuantizedSentenceTransformerBackend(SentenceTransformerBackend):
+    """SentenceTransformer with int8 dynamically-quantized Linear layers"""
+
+    name = 'int8'
+
+    def __init__(self, model_name, num_threads=None):
+        super().__init__(model_name, num_threads)
+        import torch
+
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+
+
+BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    QuantizedSentenceTransformerBackend.name: QuantizedSentenceTransformerBackend,
+}
+
+
+def load_backend(name, model_name, num_threads=None):
+    """Construct the named backend for ``model_name``"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_name, num_threads=num_threads)
+
+
+def cache_model_name(model_name, backend):
+    """Embedding cache key for a backend; quantized vectors must not mix with float32 ones"""
+    return model_name if backend == SentenceTransformerBackend.name else f"{model_name}@{backend}"
+
+
+def ranking_overlap(reference_scores, candidate_scores, top_k=20):
+    """Per-query fraction of the reference top-k that the candidate scores also rank in their top-k"""
+    reference = top_k_indices(np.atleast_2d(reference_scores), top_k)
+    candidate = top_k_indices(np.atleast_2d(candidate_scores), top_k)
+    if reference.shape[1] == 0:
+        return np.ones(len(reference))
+    return np.array([
+        len(np.intersect1d(ref, cand)) / reference.shape[1] for ref, cand in zip(reference, candidate)
+    ])
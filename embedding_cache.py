@@ -0,0 +1,149 @@
+# embedding_cache.py
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = '.cache/embeddings'
+
+
+class EmbeddingCache:
+    """On-disk cache of template embeddings keyed by a hash of the corpus text.
+
+    Embeddings live in a float32 ``embeddings.npy`` matrix that is memory-mapped
+    on open, with an ``index.json`` sidecar mapping each text hash to its row
+    and recording the model the vectors came from.
+    """
+
+    MATRIX_FILE = 'embeddings.npy'
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir, model_name, compact_ratio=0.25):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.compact_ratio = compact_ratio
+        self.hits = 0
+        self.misses = 0
+        self._rows = {}
+        self._matrix = None
+        self._lock = threading.Lock()
+        self._open()
+
+    @staticmethod
+    def text_key(text):
+        """Stable content hash for one preprocessed corpus string"""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @property
+    def matrix_path(self):
+        return os.path.join(self.cache_dir, self.MATRIX_FILE)
+
+    @property
+    def index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    def _open(self):
+        """Memory-map an existing cache, ignoring it if it belongs to another model or is inconsistent"""
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.index_path)):
+            return
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            matrix = np.load(self.matrix_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return
+
+        if index.get('model_name') != self.model_name:
+            return
+        if matrix.ndim != 2 or matrix.shape[0] != len(index.get('rows', {})):
+            return
+
+        self._rows = index['rows']
+        self._matrix = matrix
+
+    def __len__(self):
+        return len(self._rows)
+
+    def stats(self):
+        """Hit/miss counters and cache size"""
+        lookups = self.hits + self.misses
+        return {
+            'model_name': self.model_name,
+            'entries': len(self._rows),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def encode(self, texts, encode_fn, compact=False):
+        """Return embeddings for ``texts``, only passing uncached texts to ``encode_fn``.
+
+        With ``compact`` set, ``texts`` is taken to be the full live corpus: rows
+        it does not reference are stale, and once they make up more than
+        ``compact_ratio`` of the cache the files are rewritten without them.
+        """
+        with self._lock:
+            keys = [self.text_key(text) for text in texts]
+
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+
+            matrix = self._matrix
+            rows = dict(self._rows)
+            dirty = False
+
+            if missing:
+                new_vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+                start = 0 if matrix is None else matrix.shape[0]
+                for offset, key in enumerate(missing):
+                    rows[key] = start + offset
+                matrix = new_vectors if matrix is None else np.concatenate([matrix, new_vectors])
+                dirty = True
+
+            stale = len(rows) - len(set(keys))
+            if compact and rows and stale / len(rows) > self.compact_ratio:
+                order = list(dict.fromkeys(keys))
+                matrix = np.asarray(matrix[[rows[key] for key in order]])
+                rows = {key: row for row, key in enumerate(order)}
+                dirty = True
+
+            if dirty:
+                self._save(matrix, rows)
+
+            if not keys:
+                return np.zeros((0, 0 if self._matrix is None else self._matrix.shape[1]), dtype=np.float32)
+            return np.asarray(self._matrix[[self._rows[key] for key in keys]])
+
+    def _save(self, matrix, rows):
+        """Atomically replace the matrix and sidecar, then re-open the matrix memory-mapped"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._matrix = None
+
+        tmp_matrix = self.matrix_path + '.tmp'
+        tmp_index = self.index_path + '.tmp'
+        with open(tmp_matrix, 'wb') as f:
+            np.save(f, matrix)
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump({'model_name': self.model_name, 'dim': int(matrix.shape[1]), 'rows': rows}, f)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_index, self.index_path)
+
+        self._rows = rows
+        self._matrix = np.load(self.matrix_path, mmap_mode='r')
+
+    def clear(self):
+        """Drop every cached embedding"""
+        with self._lock:
+            self._rows = {}
+            self._matrix = None
+            for path in (self.matrix_path, self.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
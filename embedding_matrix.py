@@ -0,0 +1,76 @@
+# embedding_matrix.py
+import numpy as np
+
+# Supported storage types for the template embedding matrix
+STORAGE_DTYPES = ('float32', 'float16', 'int8')
+
+
+def normalise_rows(vectors):
+    """L2-normalise each row as float32, leaving all-zero rows at zero"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class EmbeddingMatrix:
+    """Row-normalised template embeddings stored as float32, float16 or int8.
+
+    float16 halves and int8 quarters the resident size of the matrix. int8
+    rows are quantized symmetrically with one float32 scale per row. Rows are
+    always handed out as float32, and products against queries are computed
+    one block of rows at a time so a full float32 copy is never materialised.
+    """
+
+    def __init__(self, embeddings, dtype='float32', block_rows=16384):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}', expected one of {STORAGE_DTYPES}")
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.dtype = dtype
+        self.block_rows = block_rows
+        self.scale = None
+
+        if dtype == 'int8':
+            scale = np.abs(embeddings).max(axis=1) / 127.0 if len(embeddings) else np.ones(0)
+            scale[scale == 0] = 1.0
+            self.values = np.round(embeddings / scale[:, np.newaxis]).astype(np.int8)
+            self.scale = scale.astype(np.float32)
+        elif dtype == 'float16':
+            self.values = embeddings.astype(np.float16)
+        else:
+            self.values = embeddings
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (0 if self.scale is None else self.scale.nbytes)
+
+    def __getitem__(self, rows):
+        """float32 copy of the selected rows (an index array or slice)"""
+        block = self.values[rows].astype(np.float32)
+        if self.scale is not None:
+            block *= self.scale[rows][..., np.newaxis]
+        return block
+
+    def to_float32(self):
+        return self[:]
+
+    def dot(self, queries, rows=None):
+        """Scores of each (normalised, float32) query row against every stored row, or only ``rows``"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.dtype == 'float32':
+            return queries @ (self.values if rows is None else self.values[rows]).T
+
+        n_rows = len(self.values) if rows is None else len(rows)
+        scores = np.empty((len(queries), n_rows), dtype=np.float32)
+        for start in range(0, n_rows, self.block_rows):
+            stop = start + self.block_rows
+            block = slice(start, stop) if rows is None else rows[start:stop]
+            scores[:, start:stop] = queries @ self[block].T
+        return scores
@@ -0,0 +1,140 @@
+# facets.py
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from text_matching import find_containing_rows
+
+# Facets a search can be filtered on by value; 'min_avg_ctr' is the one numeric filter
+FACETS = ('industry', 'client', 'business_niche')
+FILTERS = FACETS + ('min_avg_ctr',)
+
+
+def normalise_filters(filters):
+    """Canonical, hashable form of a filter mapping, dropping unset filters.
+
+    Facet filters take one value or a list of values (any of which may match,
+    case-insensitively); ``min_avg_ctr`` takes a number. The result is a
+    sorted tuple of (filter, value) pairs, so equal filters give equal cache keys.
+    """
+    if not filters:
+        return ()
+
+    unknown = set(filters) - set(FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown search filters {sorted(unknown)}, expected some of {list(FILTERS)}")
+
+    normalised = []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name == 'min_avg_ctr':
+            normalised.append((name, float(value)))
+            continue
+        values = [value] if isinstance(value, str) else list(value)
+        values = tuple(sorted({str(v).strip().lower() for v in values if str(v).strip()}))
+        if values:
+            normalised.append((name, values))
+    return tuple(sorted(normalised))
+
+
+class FacetIndex:
+    """Template membership for every facet value, precomputed once per data load.
+
+    Each facet is a boolean value x template matrix stored compressed by row,
+    so a filter turns into a boolean array over template ids: the selected
+    rows of a facet are OR-ed together and facets are AND-ed. A template
+    belongs to the clients it is tagged with, and to the industries and
+    business niches of the client profiles those clients match (the same
+    profiles whose keywords go into its corpus text).
+    """
+
+    def __init__(self, n_templates, facet_pairs, avg_ctr):
+        self.n_templates = n_templates
+        self.values = {}
+        self._value_rows = {}
+        self._members = {}
+        for facet in FACETS:
+            template_ids, values = facet_pairs.get(facet, ([], []))
+            self._build_facet(facet, np.asarray(template_ids, dtype=np.intp), pd.Series(values, dtype=object))
+
+        # Sheet CTRs may be blank, 'N/A' or carry a '%' sign; those never pass a minimum
+        avg_ctr = pd.Series(avg_ctr, dtype=object).map(str).str.strip().str.rstrip('%')
+        self.avg_ctr = pd.to_numeric(avg_ctr, errors='coerce').to_numpy(dtype=np.float64)
+
+    def _build_facet(self, facet, template_ids, values):
+        """Value labels (first-seen spelling, sorted) and the value x template membership matrix"""
+        keys = values.str.lower()
+        labels = values.groupby(keys.to_numpy(), sort=True).first()
+        self.values[facet] = labels.tolist()
+        self._value_rows[facet] = {key: row for row, key in enumerate(labels.index)}
+
+        value_rows = labels.index.get_indexer(keys)
+        self._members[facet] = sparse.csr_matrix(
+            (np.ones(len(template_ids), dtype=bool), (value_rows, template_ids)),
+            shape=(len(labels), self.n_templates),
+        )
+
+    @classmethod
+    def from_templates(cls, template_info, client_profiles, avg_ctr):
+        """Build from the index's template info, the client profiles sheet and per-template CTRs"""
+        # Blank client cells name no client, and as a substring they would match every profile
+        template_clients = pd.DataFrame(
+            [
+                (template_id, str(client))
+                for template_id, info in enumerate(template_info)
+                for client in info['associated_clients']
+                if str(client).strip()
+            ],
+            columns=['template_id', 'client'],
+        )
+        facet_pairs = {'client': (template_clients['template_id'], template_clients['client'])}
+
+        if client_profiles is not None and not client_profiles.empty and not template_clients.empty:
+            # Profile rows per client, matched as create_template_corpus matches them
+            matching_rows = find_containing_rows(template_clients['client'].unique(), client_profiles['client_type'])
+            client_rows = pd.DataFrame(
+                [(client, row) for client, rows in matching_rows.items() for row in rows],
+                columns=['client', 'row'],
+            )
+            template_rows = template_clients.merge(client_rows, on='client')[['template_id', 'row']]
+
+            for facet in ('industry', 'business_niche'):
+                if facet not in client_profiles.columns:
+                    continue
+                # Comma-separated cells contribute one value per phrase
+                values = pd.Series(client_profiles[facet].to_numpy())
+                values = values[values.notna()].map(str).str.split(',').explode().str.strip()
+                values = values[values != '']
+                pairs = template_rows.merge(
+                    pd.DataFrame({'row': values.index.to_numpy(), 'value': values.to_numpy()}), on='row'
+                ).drop_duplicates(['template_id', 'value'])
+                facet_pairs[facet] = (pairs['template_id'], pairs['value'])
+
+        return cls(len(template_info), facet_pairs, avg_ctr)
+
+    def options(self):
+        """Selectable values per facet and the (min, max) avg_ctr range, for filter widgets"""
+        options = {facet: list(self.values[facet]) for facet in FACETS}
+        known = self.avg_ctr[~np.isnan(self.avg_ctr)]
+        options['avg_ctr'] = (float(known.min()), float(known.max())) if len(known) else None
+        return options
+
+    def mask(self, filters):
+        """Boolean array of the templates passing ``filters``; None when nothing is filtered"""
+        filters = normalise_filters(dict(filters)) if isinstance(filters, dict) else filters
+        if not filters:
+            return None
+
+        mask = np.ones(self.n_templates, dtype=bool)
+        for name, value in filters:
+            if name == 'min_avg_ctr':
+                # NaN compares False, so templates without a CTR drop out
+                mask &= self.avg_ctr >= value
+                continue
+            rows = [self._value_rows[name][key] for key in value if key in self._value_rows[name]]
+            selected = np.zeros(self.n_templates, dtype=bool)
+            if rows:
+                selected[self._members[name][rows].indices] = True
+            mask &= selected
+        return mask
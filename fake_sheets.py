@@ -0,0 +1,119 @@
+# fake_sheets.py
+"""In-memory stand-in for the parts of the gspread client DataLoader uses.
+
+Lets the loader, snapshot cache and refresh logic run offline:
+
+    client = FakeSheetsClient.from_frames(client_profiles, template_tags, template_details)
+    data_loader = DataLoader(gc=client)
+"""
+import math
+import threading
+import time
+from collections import Counter
+
+from gspread.exceptions import GSpreadException
+from gspread.utils import fill_gaps, numericise_all, to_records
+
+from data_loader import SHEET_NAMES
+
+
+def _format_cell(value):
+    """Render a value the way the Sheets API returns formatted cells"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class FakeWorksheet:
+    """One worksheet holding formatted cell values: a header row plus data rows"""
+
+    def __init__(self, title, records, latency=0.0):
+        self.title = title
+        self.latency = latency
+        self.calls = 0
+        self.set_records(records)
+
+    def set_records(self, records):
+        header = list(dict.fromkeys(key for record in records for key in record))
+        self.values = [header] + [
+            [_format_cell(record.get(key)) for key in header] for record in records
+        ] if header else []
+
+    def get_all_values(self):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [list(row) for row in self.values]
+
+    def get_all_records(self):
+        """Records as gspread's Worksheet.get_all_records builds them from padded values"""
+        values = fill_gaps(self.get_all_values())
+        duplicates = [key for key, count in Counter(values[0]).items() if count > 1]
+        if duplicates:
+            raise GSpreadException(f"the header row in the worksheet contains duplicates: {duplicates}")
+        return to_records(values[0], [numericise_all(row) for row in values[1:]])
+
+
+class FakeSpreadsheet:
+    def __init__(self, client):
+        self._client = client
+
+    def worksheet(self, title):
+        try:
+            return self._client.worksheets[title]
+        except KeyError:
+            raise LookupError(f"Worksheet '{title}' not found") from None
+
+    def values_batch_get(self, ranges, params=None):
+        """Serve whole-sheet ranges like "'Client_Profiles'" in one simulated round trip"""
+        self._client.batch_calls += 1
+        self._client.maybe_fail()
+        time.sleep(self._client.latency)
+        value_ranges = []
+        for sheet_range in ranges:
+            title = sheet_range.strip("'").replace("''", "'")
+            values = [list(row) for row in self.worksheet(title).values]
+            value_ranges.append({'range': sheet_range, 'values': values})
+        return {'valueRanges': value_ranges}
+
+
+class FakeSheetsClient:
+    """gspread client stand-in serving every spreadsheet key from the same worksheets"""
+
+    def __init__(self, sheets, latency=0.0):
+        self.latency = latency
+        self.worksheets = {
+            title: FakeWorksheet(title, records, latency) for title, records in sheets.items()
+        }
+        self.batch_calls = 0
+        # Number of upcoming requests that fail with a transient ConnectionError
+        self.fail_next = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frames(cls, client_profiles, template_tags, template_details, latency=0.0):
+        """Build a client from the three DataFrames DataLoader exposes"""
+        frames = {
+            'client_profiles': client_profiles,
+            'template_tags': template_tags,
+            'template_details': template_details,
+        }
+        return cls(
+            {SHEET_NAMES[name]: frame.to_dict('records') for name, frame in frames.items()},
+            latency=latency,
+        )
+
+    def update_sheet(self, title, records):
+        """Replace a worksheet's rows, as an edit in the live sheet would"""
+        self.worksheets[title].set_records(records)
+
+    def maybe_fail(self):
+        with self._lock:
+            if self.fail_next:
+                self.fail_next -= 1
+                raise ConnectionError("Simulated Sheets API failure")
+
+    def open_by_key(self, key):
+        self.maybe_fail()
+        return FakeSpreadsheet(self)
@@ -3,21 +3,104 @@ import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
 import re
+import threading
+import time
 import warnings
+from catalog import TemplateCatalog
+from embedding_backend import SentenceTransformerBackend, load_backend, ranking_overlap
+from embedding_matrix import EmbeddingMatrix, normalise_rows
+from facets import FacetIndex, normalise_filters
+from instrumentation import NULL_INSTRUMENTATION
+from keyword_index import KeywordIndex
+from search_index import TemplateIndex, top_k_indices
+from text_matching import find_containing_rows
 warnings.filterwarnings('ignore')
 
+KEYWORD_FIELDS = ['keywords', 'industry', 'business_niche', 'marketing_focus', 'relevant_keywords']
+
 class TemplateFinder:
-    def __init__(self, data_loader):
+    MODEL_NAME = 'all-MiniLM-L6-v2'
+    # Catalogs smaller than this are always searched exactly
+    ANN_MIN_TEMPLATES = 10000
+    RETRIEVAL_MODES = ('full', 'cascade')
+    # Templates re-ranked per query by cascaded retrieval
+    CASCADE_CANDIDATES = 200
+    
+    def __init__(self, data_loader, embedding_cache=None, ann_min_templates=ANN_MIN_TEMPLATES, ann_params=None,
+                 result_cache=None, load_model_async=True, sentence_model=None, instrumentation=None,
+                 embedding_backend='float32', num_threads=None, embedding_dtype='float32',
+                 retrieval='full', cascade_candidates=CASCADE_CANDIDATES):
+        if retrieval not in self.RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{retrieval}', expected one of {list(self.RETRIEVAL_MODES)}")
         self.data_loader = data_loader
+        # 'full' scores every template; 'cascade' takes TF-IDF candidates from the inverted
+        # index (topped up by embedding neighbours) and blends scores for those only
+        self.retrieval = retrieval
+        self.cascade_candidates = cascade_candidates
+        # Encoder backend ('float32' or int8-quantized 'int8'), torch CPU threads and the
+        # storage dtype of the template embedding matrix ('float32', 'float16' or 'int8')
+        self.embedding_backend = embedding_backend
+        self.num_threads = num_threads
+        self.embedding_dtype = embedding_dtype
+        # Stage timings/counters; the default no-op keeps the disabled overhead negligible
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        self.embedding_cache = embedding_cache
+        self.result_cache = result_cache
+        self.ann_min_templates = ann_min_templates
+        self.ann_params = ann_params or {}
         self.vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2), max_features=5000)
-        # Initialize sentence transformer for semantic similarity
-        try:
-            self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-        except:
-            # Fallback if sentence transformers not available
-            self.sentence_model = None
+        self.sentence_model = None
+        self.model_error = None
+        self.model_load_seconds = None
+        self.model_ready = threading.Event()
+        self.index = None
+        # Outcome of the latest index build: duration, template diff and re-encoded count
+        self.last_reload = None
+        self._build_lock = threading.RLock()
+        
+        # Initialize sentence transformer for semantic similarity off the calling thread;
+        # TF-IDF alone answers queries until it is ready
+        if sentence_model is not None:
+            # Caller-supplied encoder (anything with encode(texts)), e.g. for offline benchmarks
+            self.sentence_model = sentence_model
+            self.model_load_seconds = 0.0
+            self.model_ready.set()
+        elif load_model_async:
+            threading.Thread(target=self._load_model, name='sentence-model-loader', daemon=True).start()
+        else:
+            self._load_model()
+    
+    def _load_model(self):
+        """Import and construct the sentence transformer, then add embeddings to the index"""
+        start = time.perf_counter()
+        with self.instrumentation.stage('load_model') as stage:
+            try:
+                self.sentence_model = load_backend(self.embedding_backend, self.MODEL_NAME, self.num_threads)
+            except Exception as e:
+                # Fallback if sentence transformers not available
+                self.model_error = e
+                self.sentence_model = None
+            stage.count(model_loaded=self.sentence_model is not None)
+        self.model_load_seconds = time.perf_counter() - start
+        self.model_ready.set()
+        
+        if self.sentence_model is not None:
+            with self._build_lock:
+                if self.index is not None and self.index.embeddings is None:
+                    self.build_index()
+    
+    def wait_for_model(self, timeout=None):
+        """Block until the model has loaded (or failed to); returns True if it is usable"""
+        self.model_ready.wait(timeout)
+        return self.sentence_model is not None
+    
+    def search_mode(self, index=None):
+        """'hybrid' once semantic scoring is available for the index, otherwise 'tfidf'"""
+        index = index or self.index
+        if self.sentence_model is not None and index is not None and index.embeddings is not None:
+            return 'hybrid'
+        return 'tfidf'
     
     def preprocess_text(self, text):
         """Clean and preprocess text for better matching"""
@@ -30,46 +113,59 @@ class TemplateFinder:
         text = re.sub(r'\s+', ' ', text).strip()
         return text
     
-    def create_template_corpus(self):
+    def _current_frames(self):
+        """Client profiles, template tags, template details and data version as one consistent set"""
+        frames = getattr(self.data_loader, 'frames', None)
+        if frames is not None:
+            return frames()
+        return (
+            self.data_loader.get_client_profiles(),
+            self.data_loader.get_template_tags(),
+            self.data_loader.get_template_details(),
+            getattr(self.data_loader, 'data_version', None),
+        )
+    
+    def create_template_corpus(self, frames=None):
         """Create template corpus by combining template details with client mappings"""
-        template_details = self.data_loader.get_template_details()
-        template_tags = self.data_loader.get_template_tags()
-        client_profiles = self.data_loader.get_client_profiles()
+        client_profiles, template_tags, template_details, _ = frames or self._current_frames()
         
-        template_corpus = []
-        template_info = []
+        # First description for each template, in sheet order
+        templates = template_details.drop_duplicates('template_name')
+        template_names = templates['template_name'].tolist()
+        descriptions = templates['description'].where(templates['template_name'].notna(), '').tolist()
         
-        # Merge template details with template tags to get client associations
-        merged_templates = pd.merge(
-            template_details, 
-            template_tags, 
-            on='template_name', 
-            how='left'
+        # Distinct clients per template, in the order they appear in the tags sheet
+        template_clients = (
+            template_tags[['template_name', 'client_name']]
+            .dropna(subset=['client_name'])
+            .drop_duplicates()
         )
+        client_keys = template_clients['client_name'].map(str)
         
-        for template_name in template_details['template_name'].unique():
-            template_data = merged_templates[merged_templates['template_name'] == template_name]
-            
-            # Get template description
-            template_desc = template_data['description'].iloc[0] if not template_data.empty else ""
-            
-            # Get associated clients for this template
-            associated_clients = template_data['client_name'].dropna().unique()
-            
-            # Find keywords from client profiles for associated clients
-            client_keywords = ""
-            for client in associated_clients:
-                client_profile = client_profiles[
-                    client_profiles['client_type'].str.contains(str(client), case=False, na=False)
-                ]
-                
-                if not client_profile.empty:
-                    for _, client_row in client_profile.iterrows():
-                        keyword_fields = ['keywords', 'industry', 'business_niche', 
-                                        'marketing_focus', 'relevant_keywords']
-                        for field in keyword_fields:
-                            if field in client_row and pd.notna(client_row[field]):
-                                client_keywords += " " + str(client_row[field])
+        # Keyword text for every client, matched against client_type once per distinct client
+        profile_text = self._client_keyword_text(client_profiles)
+        matching_rows = find_containing_rows(client_keys.unique(), client_profiles['client_type'])
+        client_text = {
+            client: ''.join(profile_text[row] for row in rows)
+            for client, rows in matching_rows.items()
+        }
+        
+        grouped = (
+            template_clients
+            .assign(client_keywords=client_keys.map(client_text))
+            .groupby('template_name', sort=False)
+            .agg(associated_clients=('client_name', list), client_keywords=('client_keywords', ''.join))
+            .reindex(template_names)
+        )
+        
+        template_corpus = []
+        template_info = []
+        
+        for template_name, template_desc, associated_clients, client_keywords in zip(
+            template_names, descriptions, grouped['associated_clients'], grouped['client_keywords']
+        ):
+            if not isinstance(associated_clients, list):
+                associated_clients, client_keywords = [], ''
             
             # Combine template description with associated client keywords
             combined_text = f"{template_desc} {client_keywords}"
@@ -79,11 +175,20 @@ class TemplateFinder:
             template_info.append({
                 'template_name': template_name,
                 'description': template_desc,
-                'associated_clients': list(associated_clients)
+                'associated_clients': associated_clients
             })
         
         return template_corpus, template_info
     
+    def _client_keyword_text(self, client_profiles):
+        """Concatenate the keyword fields of every client profile into one string per row"""
+        profile_text = pd.Series('', index=client_profiles.index, dtype=object)
+        for field in KEYWORD_FIELDS:
+            if field in client_profiles.columns:
+                values = client_profiles[field]
+                profile_text += (' ' + values.map(str)).where(values.notna(), '')
+        return profile_text.tolist()
+    
     def calculate_tfidf_similarity(self, query, template_corpus):
         """Calculate TF-IDF based similarity"""
         processed_query = self.preprocess_text(query)
@@ -121,114 +226,459 @@ class TemplateFinder:
             # Fallback to empty array if encoding fails
             return np.array([])
     
-    def find_similar_templates(self, query, top_k=20):
-        """Find templates most similar to the query using combined similarity metrics"""
-        # Create template corpus
-        template_corpus, template_info = self.create_template_corpus()
+    def build_index(self):
+        """Build the reusable search index from the currently loaded data"""
+        # Builds are serialised so a rebuild triggered by a data refresh always lands last.
+        # The new index is built beside the live one and swapped in with a single assignment,
+        # so queries already holding the old index finish on it.
+        with self._build_lock, self.instrumentation.stage('build_index') as build_stage:
+            start = time.perf_counter()
+            previous = self.index
+            frames = self._current_frames()
+            data_version = frames[3]
+            with self.instrumentation.stage('create_template_corpus') as stage:
+                template_corpus, template_info = self.create_template_corpus(frames)
+                stage.count(corpus_size=len(template_corpus))
+            with self.instrumentation.stage('encode_templates') as stage:
+                embeddings, reencoded = self._encode_templates(template_corpus, previous)
+                stage.count(embedding_rows=0 if embeddings is None else len(embeddings), reencoded=reencoded)
+            with self.instrumentation.stage('fit_tfidf') as stage:
+                # Without an embedding cache, the next reload reuses unchanged rows from this index
+                index = TemplateIndex(
+                    template_corpus, template_info, self.vectorizer, embeddings, self.embedding_dtype,
+                    keep_source_embeddings=self.embedding_cache is None,
+                )
+                stage.count(vocabulary_size=0 if index.term_counts is None else len(index.vocabulary))
+            index.data_version = data_version
+            with self.instrumentation.stage('build_catalog'):
+                index.catalog = TemplateCatalog(template_info, frames[2], frames[1])
+            with self.instrumentation.stage('build_keyword_index') as stage:
+                index.keywords = KeywordIndex.from_profiles(frames[0], KEYWORD_FIELDS)
+                stage.count(keyword_phrases=len(index.keywords))
+            with self.instrumentation.stage('build_facets') as stage:
+                index.facets = FacetIndex.from_templates(template_info, frames[0], index.catalog.avg_ctr)
+                stage.count(**{f"{facet}_values": len(values) for facet, values in index.facets.values.items()})
+            if self.ann_min_templates is not None and len(index) >= self.ann_min_templates:
+                with self.instrumentation.stage('build_ann') as stage:
+                    index.build_ann(**self.ann_params)
+                    stage.count(ann_lists=0 if index.ann is None else index.ann.n_lists)
+            self.index = index
+            if self.result_cache is not None:
+                # Results from the previous data version can never be served again
+                self.result_cache.invalidate(keep_version=data_version)
+            
+            self.last_reload = {
+                'data_version': data_version,
+                'previous_version': None if previous is None else previous.data_version,
+                'seconds': time.perf_counter() - start,
+                'templates': len(template_corpus),
+                'reencoded': reencoded,
+                **self._diff_templates(previous, template_corpus, template_info),
+                'sheet_diff': getattr(self.data_loader, 'last_diff', None),
+            }
+            build_stage.count(**{key: value for key, value in self.last_reload.items() if key != 'sheet_diff'})
+            return self.index
+    
+    def get_index(self):
+        """Return the search index, building it on first use"""
+        if self.index is None:
+            self.build_index()
+        return self.index
+    
+    def _encode_templates(self, template_corpus, previous=None):
+        """Encode the template corpus for the index, returning (embeddings, number of texts encoded).
         
-        if not template_corpus:
-            return pd.DataFrame()
+        Only texts without an embedding are passed to the model: the embedding
+        cache supplies the rest when one is configured, otherwise they are
+        copied from the ``previous`` index's float32 source rows (never its
+        float16/int8 matrix), so a reload only encodes templates whose corpus
+        text changed.
+        """
+        if self.sentence_model is None or not template_corpus:
+            return None, 0
+        
+        encoded = [0]
         
+        def encode(texts):
+            encoded[0] += len(texts)
+            return self.sentence_model.encode(texts)
+        
+        try:
+            if self.embedding_cache is not None:
+                return self.embedding_cache.encode(template_corpus, encode, compact=True), encoded[0]
+            
+            reusable = {}
+            source = None if previous is None else previous.source_embeddings
+            if source is not None:
+                reusable = {text: row for row, text in enumerate(previous.template_corpus)}
+            missing = list(dict.fromkeys(text for text in template_corpus if text not in reusable))
+            if not reusable:
+                return encode(template_corpus), encoded[0]
+            
+            embeddings = np.empty((len(template_corpus), source.shape[1]), dtype=np.float32)
+            old = [pos for pos, text in enumerate(template_corpus) if text in reusable]
+            if old:
+                embeddings[old] = source[[reusable[template_corpus[pos]] for pos in old]]
+            if missing:
+                new_rows = {text: row for row, text in enumerate(missing)}
+                new = [pos for pos, text in enumerate(template_corpus) if text not in reusable]
+                embeddings[new] = np.asarray(encode(missing), dtype=np.float32)[
+                    [new_rows[template_corpus[pos]] for pos in new]
+                ]
+            return embeddings, encoded[0]
+        except Exception:
+            return None, 0
+    
+    def _diff_templates(self, previous, template_corpus, template_info):
+        """Templates added, removed, changed (different corpus text) and unchanged since ``previous``"""
+        new = {info['template_name']: text for info, text in zip(template_info, template_corpus)}
+        if previous is None:
+            return {'added': len(new), 'removed': 0, 'changed': 0, 'unchanged': 0}
+        
+        old = {info['template_name']: text for info, text in zip(previous.template_info, previous.template_corpus)}
+        common = [name for name in new if name in old]
+        changed = sum(1 for name in common if new[name] != old[name])
+        return {
+            'added': len(new) - len(common),
+            'removed': len(old) - len(common),
+            'changed': changed,
+            'unchanged': len(common) - changed,
+        }
+    
+    def _semantic_scores(self, index, processed_queries, exact=False, must_score=None, template_ids=None):
+        """Encode the queries in one call and score them against the indexed template embeddings"""
+        if self.sentence_model is None or index.embeddings is None:
+            return np.array([])
+        
+        try:
+            with self.instrumentation.stage('encode_queries', queries=len(processed_queries)):
+                query_embeddings = self.sentence_model.encode(processed_queries)
+        except Exception:
+            return np.array([])
+        approximate = index.ann is not None and not exact and template_ids is None
+        with self.instrumentation.stage('semantic_scores', approximate=approximate):
+            return index.semantic_scores(
+                query_embeddings, exact=exact, must_score=must_score, template_ids=template_ids
+            )
+    
+    def _combined_scores(self, index, processed_queries, exact=False, template_ids=None):
+        """Blend TF-IDF and semantic similarity for a batch of queries.
+        
+        Returns the scores (one row per query, one column per template or per
+        entry of ``template_ids`` when given) and the mode that produced them:
+        'hybrid', 'semantic' or 'tfidf'.
+        """
         # Calculate TF-IDF similarity
-        tfidf_similarities = self.calculate_tfidf_similarity(query, template_corpus)
+        with self.instrumentation.stage('tfidf_scores', queries=len(processed_queries)):
+            tfidf_similarities = index.tfidf_scores(processed_queries, template_ids)
         
-        # Calculate semantic similarity
-        semantic_similarities = self.calculate_semantic_similarity(query, template_corpus)
+        # Calculate semantic similarity; under ANN, lexical matches are always scored exactly
+        must_score = None
+        if len(tfidf_similarities) > 0 and template_ids is None:
+            must_score = tfidf_similarities > 0
+        semantic_similarities = self._semantic_scores(
+            index, processed_queries, exact=exact, must_score=must_score, template_ids=template_ids
+        )
         
         # Combine both similarity scores (weighted average)
         if len(tfidf_similarities) > 0 and len(semantic_similarities) > 0:
-            combined_similarities = (0.4 * tfidf_similarities + 0.6 * semantic_similarities)
+            return 0.4 * tfidf_similarities + 0.6 * semantic_similarities, 'hybrid'
         elif len(semantic_similarities) > 0:
-            combined_similarities = semantic_similarities
+            return semantic_similarities, 'semantic'
         elif len(tfidf_similarities) > 0:
-            combined_similarities = tfidf_similarities
-        else:
-            return pd.DataFrame()
+            return tfidf_similarities, 'tfidf'
+        return None, None
+    
+    def check_ann_recall(self, queries, top_k=20):
+        """Recall@k of the ANN-backed ranking against the exact ranking for sample queries"""
+        index = self.get_index()
+        if index.ann is None:
+            return 1.0
+        
+        processed_queries = [self.preprocess_text(query) for query in queries]
+        approx = top_k_indices(self._combined_scores(index, processed_queries)[0], top_k)
+        exact = top_k_indices(self._combined_scores(index, processed_queries, exact=True)[0], top_k)
+        hits = [len(np.intersect1d(a, e)) for a, e in zip(approx, exact)]
+        return float(np.mean(hits)) / exact.shape[1]
+    
+    def check_cascade_recall(self, queries, top_k=20, cascade_candidates=None):
+        """Recall@k of cascaded retrieval against the full blended ranking for sample queries.
         
-        # Get top k recommendations
-        top_indices = np.argsort(combined_similarities)[::-1][:top_k]
+        Reports the mean and worst fraction of the full top-k that the cascade
+        also returns, the time each path takes for the whole sample, and how
+        often the dense fallback had to supply candidates.
+        """
+        index = self.get_index()
+        processed_queries = [self.preprocess_text(query) for query in queries]
+        cascade_candidates = cascade_candidates or self.cascade_candidates
         
-        # Create recommendations dataframe
-        recommendations = self._build_recommendations_dataframe(
-            top_indices, combined_similarities, template_info
-        )
+        start = time.perf_counter()
+        full_scores, _ = self._combined_scores(index, processed_queries, exact=True)
+        full_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        ranked, mode, stats = self._cascade_rankings(index, processed_queries, top_k, cascade_candidates)
+        cascade_seconds = time.perf_counter() - start
         
-        return recommendations
+        if full_scores is None:
+            full_scores = np.zeros((len(queries), 0))
+        # Only positive scores are ever shown, so only those count towards recall
+        reference = [
+            expected[full_scores[row, expected] > 0]
+            for row, expected in enumerate(top_k_indices(full_scores, top_k))
+        ]
+        recall = np.array([
+            len(np.intersect1d(expected, template_ids)) / len(expected) if len(expected) else 1.0
+            for expected, (template_ids, _) in zip(reference, ranked)
+        ])
+        return {
+            'search_mode': mode,
+            'top_k': top_k,
+            'queries': len(queries),
+            'corpus_size': len(index),
+            'cascade_candidates': cascade_candidates,
+            'recall': float(recall.mean()) if len(recall) else 1.0,
+            'min_recall': float(recall.min()) if len(recall) else 1.0,
+            'dense_fallback_rate': stats['dense_fallback'] / len(queries) if queries else 0.0,
+            'mean_candidates': stats['candidates'] / len(queries) if queries else 0.0,
+            'full_seconds': full_seconds,
+            'cascade_seconds': cascade_seconds,
+        }
     
-    def _build_recommendations_dataframe(self, top_indices, similarities, template_info):
-        """Build the final recommendations dataframe"""
-        template_details = self.data_loader.get_template_details()
-        template_tags = self.data_loader.get_template_tags()
+    def check_backend_agreement(self, queries, top_k=20, reference_backend=None):
+        """Top-k agreement of the configured backend and storage dtype with the float32 path.
         
-        recommendations = []
+        Ranks the sample queries twice with exact scoring: once as configured and
+        once with a full-precision encoder (``reference_backend``, loaded on
+        demand) and float32 embeddings. Reports the mean and worst overlap of the
+        top-k lists, for both the blended ranking and semantic scores alone.
+        """
+        if not self.wait_for_model():
+            raise RuntimeError(f"Sentence model unavailable: {self.model_error}")
+        index = self.get_index()
+        if index.embeddings is None:
+            raise RuntimeError("The search index has no template embeddings")
         
-        for idx in top_indices:
-            if similarities[idx] > 0:  # Only include positive similarities
-                template_name = template_info[idx]['template_name']
-                
-                # Get additional template details
-                template_detail = template_details[
-                    template_details['template_name'] == template_name
-                ]
-                
-                if template_detail.empty:
-                    continue
-                
-                template_detail = template_detail.iloc[0]
-                
-                # Get preview URL from template tags
-                template_preview = template_tags[
-                    template_tags['template_name'] == template_name
-                ]
-                preview_url = template_preview['preview_url'].iloc[0] if not template_preview.empty else ""
-                
-                recommendations.append({
-                    'Template Name': template_name,
-                    'Description': template_detail['description'],
-                    'Similarity Score': round(similarities[idx] * 100, 2),
-                    'Open Preview': preview_url,
-                    'avg_ctr': template_detail.get('avg_ctr', 'N/A'),
-                    'Associated Clients': ', '.join(template_info[idx]['associated_clients'])
-                })
+        if reference_backend is None:
+            reference_backend = load_backend(SentenceTransformerBackend.name, self.MODEL_NAME, self.num_threads)
+        processed_queries = [self.preprocess_text(query) for query in queries]
         
-        return pd.DataFrame(recommendations)
+        start = time.perf_counter()
+        candidate_semantic = self._semantic_scores(index, processed_queries, exact=True)
+        candidate_seconds = time.perf_counter() - start
+        
+        reference_embeddings = EmbeddingMatrix(normalise_rows(reference_backend.encode(index.template_corpus)))
+        start = time.perf_counter()
+        reference_semantic = reference_embeddings.dot(normalise_rows(reference_backend.encode(processed_queries)))
+        reference_seconds = time.perf_counter() - start
+        
+        tfidf_similarities = index.tfidf_scores(processed_queries)
+        if len(tfidf_similarities) > 0:
+            candidate_combined = 0.4 * tfidf_similarities + 0.6 * candidate_semantic
+            reference_combined = 0.4 * tfidf_similarities + 0.6 * reference_semantic
+        else:
+            candidate_combined, reference_combined = candidate_semantic, reference_semantic
+        
+        combined_overlap = ranking_overlap(reference_combined, candidate_combined, top_k)
+        semantic_overlap = ranking_overlap(reference_semantic, candidate_semantic, top_k)
+        return {
+            'backend': getattr(self.sentence_model, 'name', type(self.sentence_model).__name__),
+            'embedding_dtype': self.embedding_dtype,
+            'top_k': top_k,
+            'queries': len(queries),
+            'overlap': float(combined_overlap.mean()),
+            'min_overlap': float(combined_overlap.min()),
+            'semantic_overlap': float(semantic_overlap.mean()),
+            'semantic_min_overlap': float(semantic_overlap.min()),
+            # Encoding plus semantic scoring of all sample queries
+            'query_seconds': candidate_seconds,
+            'reference_query_seconds': reference_seconds,
+            'embedding_matrix_bytes': index.embeddings.nbytes,
+        }
     
-    def get_template_by_client(self, client_name):
-        """Get all templates associated with a specific client"""
-        template_tags = self.data_loader.get_template_tags()
-        template_details = self.data_loader.get_template_details()
+    def find_similar_templates(self, query, top_k=20, result_cache=None, filters=None):
+        """Find templates most similar to the query using combined similarity metrics"""
+        return self.find_similar_templates_batch(
+            [query], top_k=top_k, result_cache=result_cache, filters=filters
+        )[0]
+    
+    def find_similar_templates_batch(self, queries, top_k=20, result_cache=None, filters=None):
+        """Find similar templates for many queries at once, returning one dataframe per query.
+        
+        ``filters`` restricts every query to templates matching all of the given
+        facets, e.g. ``{'industry': 'Automotive', 'client': ['Acme'],
+        'business_niche': 'ev', 'min_avg_ctr': 1.5}``. The matching templates
+        come from the precomputed facet index, and only they are scored and
+        ranked, exactly, whatever the retrieval mode.
         
-        # Filter templates by client
-        client_templates = template_tags[
-            template_tags['client_name'].str.contains(client_name, case=False, na=False)
+        Results are looked up in ``result_cache`` (defaulting to the finder's own
+        cache) by data version, search mode, retrieval settings, filters,
+        preprocessed query and top_k; only misses are scored. Each dataframe
+        records the mode that produced it in ``attrs['search_mode']`` and the
+        retrieval path in ``attrs['retrieval']``.
+        """
+        queries = list(queries)
+        index = self.get_index()
+        
+        if not index.template_corpus or not queries:
+            return [pd.DataFrame() for _ in queries]
+        
+        processed_queries = [self.preprocess_text(query) for query in queries]
+        filters = normalise_filters(filters)
+        cache = self.result_cache if result_cache is None else result_cache
+        mode = self.search_mode(index)
+        retrieval = (self.retrieval, self.cascade_candidates) if self.retrieval == 'cascade' else self.retrieval
+        keys = [
+            (index.data_version, mode, retrieval, filters, processed_query, top_k)
+            for processed_query in processed_queries
         ]
         
-        # Merge with template details
-        result = pd.merge(
-            client_templates,
-            template_details,
-            on='template_name',
-            how='left'
-        )
+        results = [None] * len(queries)
+        if cache is not None:
+            results = [cache.get(key) for key in keys]
         
-        return result
+        pending = [row for row, result in enumerate(results) if result is None]
+        if pending:
+            with self.instrumentation.stage('search') as stage:
+                stage.count(queries=len(queries), cache_hits=len(queries) - len(pending), top_k=top_k,
+                            corpus_size=len(index), search_mode=mode, retrieval=self.retrieval)
+                template_ids = None
+                if filters:
+                    with self.instrumentation.stage('apply_filters', filters=len(filters)) as filter_stage:
+                        template_ids = np.flatnonzero(index.facets.mask(filters))
+                        filter_stage.count(matching_templates=len(template_ids))
+                ranked = self._rank_queries(
+                    index, [processed_queries[row] for row in pending], top_k, template_ids
+                )
+            for row, recommendations in zip(pending, ranked):
+                results[row] = recommendations
+                if cache is not None and recommendations.attrs.get('search_mode') == mode:
+                    cache.put(keys[row], recommendations)
+        
+        return results
     
-    def get_popular_keywords(self, top_n=10):
-        """Get most popular keywords from client profiles"""
-        client_profiles = self.data_loader.get_client_profiles()
-        all_keywords = []
+    def _rank_queries(self, index, processed_queries, top_k, template_ids=None):
+        """Score preprocessed queries against the index (or only ``template_ids``) and build their dataframes"""
+        if self.retrieval == 'cascade' and template_ids is None:
+            return self._rank_queries_cascade(index, processed_queries, top_k)
         
-        for _, row in client_profiles.iterrows():
-            keyword_fields = ['keywords', 'industry', 'business_niche', 
-                            'marketing_focus', 'relevant_keywords']
-            
-            for field in keyword_fields:
-                if field in row and pd.notna(row[field]):
-                    keywords = str(row[field]).split(',')
-                    all_keywords.extend([kw.strip().lower() for kw in keywords])
+        combined_similarities, mode = self._combined_scores(index, processed_queries, template_ids=template_ids)
+        
+        if combined_similarities is None:
+            return [pd.DataFrame() for _ in processed_queries]
+        
+        # Get top k recommendations per query
+        with self.instrumentation.stage('rank'):
+            top_indices = top_k_indices(combined_similarities, top_k)
+        
+        # Create recommendations dataframes
+        results = []
+        with self.instrumentation.stage('assemble_results'):
+            for row in range(len(processed_queries)):
+                recommendations = self._build_recommendations_dataframe(
+                    top_indices[row], combined_similarities[row], index.catalog, template_ids
+                )
+                recommendations.attrs['search_mode'] = mode
+                recommendations.attrs['retrieval'] = 'full'
+                results.append(recommendations)
+        return results
+    
+    def _rank_queries_cascade(self, index, processed_queries, top_k):
+        """Rank preprocessed queries by cascaded retrieval and build their recommendation dataframes"""
+        ranked, mode, _ = self._cascade_rankings(index, processed_queries, top_k, self.cascade_candidates)
+        if mode is None:
+            return [pd.DataFrame() for _ in processed_queries]
+        
+        results = []
+        with self.instrumentation.stage('assemble_results'):
+            for template_ids, scores in ranked:
+                recommendations = index.catalog.results_for_scores(template_ids, scores)
+                recommendations.attrs['search_mode'] = mode
+                recommendations.attrs['retrieval'] = 'cascade'
+                results.append(recommendations)
+        return results
+    
+    def _cascade_rankings(self, index, processed_queries, top_k, cascade_candidates):
+        """Two-stage ranking: (template ids, blended scores) best first per query, the mode and counts.
+        
+        Stage one reads the inverted index for each query's best ``cascade_candidates``
+        TF-IDF matches. When fewer share a term with the query (none at all is
+        the dense-only fallback), the nearest templates by embedding fill the
+        set. Stage two scores embeddings for the candidates alone and blends
+        0.4/0.6 as the full path does, so a candidate's score is the same
+        either way; only templates outside the set can be missed.
+        """
+        # top_k=None ranks every template, as in top_k_indices
+        top_k = len(index) if top_k is None else max(0, top_k)
+        n_candidates = max(cascade_candidates, top_k)
+        query_embeddings = None
+        if self.sentence_model is not None and index.embeddings is not None:
+            try:
+                with self.instrumentation.stage('encode_queries', queries=len(processed_queries)):
+                    query_embeddings = self.sentence_model.encode(processed_queries)
+            except Exception:
+                query_embeddings = None
+        has_tfidf = index.term_counts is not None
+        if query_embeddings is None:
+            mode = 'tfidf' if has_tfidf else None
+        else:
+            mode = 'hybrid' if has_tfidf else 'semantic'
         
-        # Count keyword frequency
-        from collections import Counter
-        keyword_counts = Counter(all_keywords)
+        with self.instrumentation.stage('lexical_candidates', queries=len(processed_queries)) as stage:
+            lexical = index.lexical_candidates(processed_queries, n_candidates)
+            stage.count(lexical_candidates=sum(len(template_ids) for template_ids, _ in lexical))
         
-        return keyword_counts.most_common(top_n)
+        # dense_fallback counts queries without a single lexical candidate
+        stats = {'candidates': 0, 'dense_candidates': 0, 'dense_fallback': 0}
+        ranked = []
+        with self.instrumentation.stage('rerank_candidates', queries=len(processed_queries)) as stage:
+            for row, (template_ids, tfidf_scores) in enumerate(lexical):
+                if query_embeddings is not None:
+                    shortfall = n_candidates - len(template_ids)
+                    stats['dense_fallback'] += len(template_ids) == 0
+                    if shortfall > 0:
+                        dense_ids = index.dense_candidates(query_embeddings[row:row + 1], shortfall, template_ids)
+                        template_ids = np.concatenate([template_ids, dense_ids])
+                        tfidf_scores = np.concatenate([tfidf_scores, np.zeros(len(dense_ids))])
+                        stats['dense_candidates'] += len(dense_ids)
+                    semantic = index.candidate_semantic_scores(query_embeddings[row:row + 1], template_ids)
+                    scores = 0.4 * tfidf_scores + 0.6 * semantic if has_tfidf else semantic
+                else:
+                    scores = tfidf_scores
+                stats['candidates'] += len(template_ids)
+                
+                # Best first, ties to the higher template id as in top_k_indices
+                order = np.lexsort((-template_ids, -scores))[:top_k]
+                ranked.append((template_ids[order], scores[order]))
+            stage.count(**stats)
+        return ranked, mode, stats
+    
+    def _build_recommendations_dataframe(self, top_indices, similarities, catalog, template_ids=None):
+        """Build the final recommendations dataframe"""
+        # Only include positive similarities, gathered from the catalog columns
+        if template_ids is not None:
+            # Scores cover a filtered subset; map its columns back to template ids
+            return catalog.results_for_scores(template_ids[top_indices], similarities[top_indices])
+        return catalog.results(top_indices, similarities)
+    
+    def get_template_by_client(self, client_name):
+        """Get all templates associated with a specific client"""
+        return self.get_index().catalog.templates_for_client(client_name)
+    
+    def get_facet_options(self):
+        """Filter values per facet ('industry', 'client', 'business_niche') and the avg_ctr range"""
+        return self.get_index().facets.options()
+    
+    def get_keyword_index(self):
+        """Keyword phrase index for the current data, built with the search index"""
+        index = self.index
+        if index is not None and index.keywords is not None:
+            return index.keywords
+        return KeywordIndex.from_profiles(self._current_frames()[0], KEYWORD_FIELDS)
+    
+    def get_popular_keywords(self, top_n=10):
+        """Get most popular keywords from client profiles"""
+        return self.get_keyword_index().most_common(top_n)
+    
+    def suggest_keywords(self, prefix, limit=8):
+        """Autocomplete suggestions for the search box, most frequent keyword phrases first"""
+        return self.get_keyword_index().suggest(prefix, limit)
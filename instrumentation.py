@@ -0,0 +1,215 @@
+# instrumentation.py
+import logging
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class _NullStage:
+    """Shared no-op stage handed out when instrumentation is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def count(self, **counters):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """Timing context for one pipeline stage; ``count`` attaches counters to its record"""
+
+    __slots__ = ('_instrumentation', 'name', 'component', 'counters', 'parent', 'depth',
+                 '_start', '_memory_start', '_memory_peak', 'children')
+
+    def __init__(self, instrumentation, name, component, counters):
+        self._instrumentation = instrumentation
+        self.name = name
+        self.component = component
+        self.counters = counters
+        self.parent = None
+        self.depth = 0
+        self.children = []
+
+    def count(self, **counters):
+        self.counters.update(counters)
+
+    def __enter__(self):
+        self._instrumentation._enter(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._instrumentation._exit(self, exc_type)
+        return False
+
+
+class Instrumentation:
+    """Per-stage latency, counters and peak memory for TemplateFinder and DataLoader.
+
+    Components wrap each stage in ``with instrumentation.stage(name):``. Every
+    finished stage becomes a record dict that is logged on the
+    ``instrumentation`` logger (as ``extra={'stage_record': record}``), passed
+    to each registered callback and aggregated for the diagnostics panel.
+    Stages nest per thread; when an outermost stage finishes, it and all of
+    its nested stages are kept as one trace in ``traces``, in start order.
+
+    With ``sample_memory`` the peak traced Python allocation of each stage is
+    recorded via tracemalloc (approximate when stages run concurrently on
+    several threads), along with the process's peak RSS.
+    """
+
+    enabled = True
+
+    def __init__(self, callbacks=None, sample_memory=False, log_level=logging.DEBUG, max_traces=50):
+        self.callbacks = list(callbacks or [])
+        self.sample_memory = sample_memory
+        self.log_level = log_level
+        self.traces = deque(maxlen=max_traces)
+        self.gauges = {}
+        self._totals = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if sample_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add_callback(self, callback):
+        """Call ``callback(record)`` for every finished stage"""
+        self.callbacks.append(callback)
+
+    def stage(self, name, component='finder', **counters):
+        return Stage(self, name, component, counters)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, stage):
+        stack = self._stack()
+        if stack:
+            stage.parent = stack[-1]
+            stage.depth = stage.parent.depth + 1
+
+        if self.sample_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Fold the peak seen so far into the enclosing stage before resetting it
+            if stage.parent is not None:
+                stage.parent._memory_peak = max(stage.parent._memory_peak, peak)
+            tracemalloc.reset_peak()
+            stage._memory_start = current
+            stage._memory_peak = current
+
+        stack.append(stage)
+        stage._start = time.perf_counter()
+
+    def _exit(self, stage, exc_type):
+        elapsed = time.perf_counter() - stage._start
+        stack = self._stack()
+        if stack and stack[-1] is stage:
+            stack.pop()
+
+        record = {
+            'stage': stage.name,
+            'component': stage.component,
+            'seconds': elapsed,
+            'depth': stage.depth,
+            'parent': stage.parent.name if stage.parent is not None else None,
+            'thread': threading.current_thread().name,
+            'started_at': time.time() - elapsed,
+            'ok': exc_type is None,
+            'counters': stage.counters,
+        }
+
+        if self.sample_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], stage._memory_peak)
+            record['peak_memory_bytes'] = peak - stage._memory_start
+            if stage.parent is not None:
+                stage.parent._memory_peak = max(stage.parent._memory_peak, peak)
+            if resource is not None:
+                # ru_maxrss is in kilobytes on Linux
+                record['max_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+        self._record(stage, record)
+
+    def _record(self, stage, record):
+        with self._lock:
+            totals = self._totals.setdefault((record['component'], record['stage']), {
+                'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+            })
+            totals['calls'] += 1
+            totals['total_seconds'] += record['seconds']
+            totals['max_seconds'] = max(totals['max_seconds'], record['seconds'])
+            totals['last_seconds'] = record['seconds']
+            if 'peak_memory_bytes' in record:
+                totals['peak_memory_bytes'] = max(totals.get('peak_memory_bytes', 0), record['peak_memory_bytes'])
+            self.gauges.update(record['counters'])
+
+            trace = stage.children + [record]
+            if stage.parent is not None:
+                stage.parent.children.extend(trace)
+            else:
+                self.traces.append(sorted(trace, key=lambda item: (item['started_at'], item['depth'])))
+
+        logger.log(self.log_level, "%s.%s took %.4fs %s", record['component'], record['stage'],
+                   record['seconds'], record['counters'], extra={'stage_record': record})
+
+        for callback in list(self.callbacks):
+            try:
+                callback(record)
+            except Exception as e:
+                logger.warning("Instrumentation callback failed: %s", e)
+
+    def last_trace(self, stage=None):
+        """Records of the most recent outermost stage (named ``stage`` if given) and its nested stages"""
+        with self._lock:
+            for trace in reversed(self.traces):
+                if stage is None or trace[0]['stage'] == stage:
+                    return list(trace)
+        return []
+
+    def summary(self):
+        """Call count, total/mean/max/last seconds (and peak memory) per stage"""
+        with self._lock:
+            rows = []
+            for (component, name), totals in self._totals.items():
+                row = {'component': component, 'stage': name, **totals}
+                row['mean_seconds'] = totals['total_seconds'] / totals['calls']
+                rows.append(row)
+            return rows
+
+    def reset(self):
+        with self._lock:
+            self.traces.clear()
+            self.gauges.clear()
+            self._totals.clear()
+
+
+class NullInstrumentation(Instrumentation):
+    """Disabled instrumentation: every stage is the same no-op context manager"""
+
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+
+    def stage(self, name, component='finder', **counters):
+        return _NULL_STAGE
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
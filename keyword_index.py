@@ -0,0 +1,92 @@
+# keyword_index.py
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+
+class KeywordIndex:
+    """Frequency-weighted prefix index over the comma-separated client keyword phrases.
+
+    Built once per data load. Phrases are counted the way get_popular_keywords
+    always counted them: split on commas, stripped and lowercased, with ties
+    kept in first-seen order. For autocomplete, every word start of every
+    phrase is a key in one sorted list, so a prefix lookup is two binary
+    searches followed by a top-n over that key range.
+    """
+
+    def __init__(self, phrases, counts):
+        self.phrases = list(phrases)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+        keys, phrase_ids = [], []
+        for phrase_id, phrase in enumerate(self.phrases):
+            if not phrase:
+                continue
+            # Match from the start of every word, so 'sale' also finds 'festive sale'
+            for start in [0] + [pos + 1 for pos, ch in enumerate(phrase) if ch == ' ']:
+                if start < len(phrase):
+                    keys.append(phrase[start:])
+                    phrase_ids.append(phrase_id)
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[i] for i in order]
+        self._key_phrase_ids = np.asarray([phrase_ids[i] for i in order], dtype=np.intp)
+
+    def __len__(self):
+        return len(self.phrases)
+
+    @classmethod
+    def from_profiles(cls, client_profiles, fields):
+        """Count keyword phrases across ``fields`` of every client profile, using vectorized pandas"""
+        if client_profiles is None or client_profiles.empty:
+            return cls([], [])
+
+        positions = np.arange(len(client_profiles))
+        pieces = []
+        for field_order, field in enumerate(fields):
+            if field not in client_profiles.columns:
+                continue
+            values = pd.Series(client_profiles[field].to_numpy(), index=positions)
+            values = values[values.notna()]
+            if values.empty:
+                continue
+            values = values.map(str).str.split(',').explode()
+            pieces.append(pd.DataFrame({
+                'row': values.index.to_numpy(),
+                'field': field_order,
+                'phrase': values.str.strip().str.lower().to_numpy(),
+            }))
+        if not pieces:
+            return cls([], [])
+
+        # Row-major order (row, then field, then position in the cell) fixes first-seen order for ties
+        phrases = (
+            pd.concat(pieces, ignore_index=True)
+            .sort_values(['row', 'field'], kind='stable')['phrase']
+        )
+        counts = phrases.value_counts(sort=False)
+        first_seen = phrases.drop_duplicates()
+        counts = counts.reindex(first_seen.to_numpy())
+        order = np.argsort(-counts.to_numpy(), kind='stable')
+        return cls(counts.index.to_numpy()[order], counts.to_numpy()[order])
+
+    def most_common(self, top_n=10):
+        """(phrase, count) pairs, most frequent first, as Counter.most_common returns them"""
+        return [(self.phrases[i], int(self.counts[i])) for i in range(min(top_n, len(self.phrases)))]
+
+    def suggest(self, prefix, limit=8):
+        """Most frequent phrases with a word starting with ``prefix`` (case-insensitive)"""
+        prefix = ' '.join(str(prefix).lower().split())
+        if not prefix or not self._keys:
+            return []
+
+        start = bisect_left(self._keys, prefix)
+        # Every key with this prefix sorts below prefix + the largest code point
+        stop = bisect_left(self._keys, prefix + '\U0010ffff', lo=start)
+        if start == stop:
+            return []
+
+        # Phrases are stored most frequent first, so the lowest ids are the best matches
+        phrase_ids = np.unique(self._key_phrase_ids[start:stop])[:limit]
+        return [self.phrases[i] for i in phrase_ids]
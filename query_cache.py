@@ -0,0 +1,86 @@
+# query_cache.py
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryResultCache:
+    """Bounded LRU cache of recommendation DataFrames with a time-to-live.
+
+    TemplateFinder keys entries by (data_version, search mode, retrieval,
+    normalised filters, preprocessed query, top_k), where retrieval is 'full'
+    or ('cascade', cascade_candidates) and filters is normalise_filters'
+    tuple. Results computed against older sheet data, or while the semantic
+    model was still loading, are never served once the index is rebuilt;
+    invalidate() relies on data_version being the first key element.
+    """
+
+    def __init__(self, max_entries=256, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _size(key, value):
+        return sum(sys.getsizeof(part) for part in key) + int(value.memory_usage(index=True, deep=True).sum())
+
+    def get(self, key):
+        """Return a copy of the cached result, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy()
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            size = self._size(key, value)
+            self._entries[key] = (value.copy(), time.monotonic(), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, keep_version=None):
+        """Drop every entry not computed against ``keep_version`` (all entries when None)"""
+        with self._lock:
+            for key in [key for key in self._entries if keep_version is None or key[0] != keep_version]:
+                self._remove(key)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        """Hit rate, size and approximate memory footprint"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'memory_bytes': self._bytes,
+        }
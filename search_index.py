@@ -0,0 +1,340 @@
+# search_index.py
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+from ann_index import IVFIndex
+from embedding_matrix import EmbeddingMatrix, normalise_rows
+
+
+class TemplateIndex:
+    """Prebuilt search structures for one snapshot of the template data.
+
+    Holds the template corpus and metadata, the term-count matrix behind the
+    TF-IDF scorer and the normalised template embedding matrix, so a query
+    only has to be tokenised/encoded and scored against them.
+    """
+
+    def __init__(self, template_corpus, template_info, vectorizer, embeddings=None, embedding_dtype='float32',
+                 keep_source_embeddings=False):
+        self.template_corpus = template_corpus
+        self.template_info = template_info
+        self.data_version = None
+        self.catalog = None
+        self.keywords = None
+        self.facets = None
+        self.ann = None
+        self._build_tfidf(vectorizer)
+        self._build_embeddings(embeddings, embedding_dtype, keep_source_embeddings)
+
+    def __len__(self):
+        return len(self.template_corpus)
+
+    def _build_tfidf(self, vectorizer):
+        """Count terms once using the same analyzer settings as the TF-IDF vectorizer.
+
+        The vocabulary is counted without the vectorizer's max_features cap: the
+        original refit chose its top terms from corpus + query counts, so the
+        cap is applied per query (see _query_weights) from the stored term totals.
+        """
+        params = vectorizer.get_params()
+        count_keys = set(CountVectorizer().get_params()) - {'dtype', 'max_features'}
+        self.count_vectorizer = CountVectorizer(
+            **{key: value for key, value in params.items() if key in count_keys}
+        )
+        self.max_features = params.get('max_features')
+        self.term_counts = None
+
+        if not self.template_corpus:
+            return
+
+        try:
+            counts = self.count_vectorizer.fit_transform(self.template_corpus)
+        except ValueError:
+            # Empty vocabulary, e.g. every template text is blank
+            return
+
+        # Corpus-wide frequency of every term, in the vectorizer's (alphabetical) column order
+        self.term_totals = np.asarray(counts.sum(axis=0)).ravel()
+        self.terms = self.count_vectorizer.get_feature_names_out()
+        self.term_counts = counts.astype(np.float64).tocsr()
+        self.term_counts_sq = self.term_counts.multiply(self.term_counts).tocsr()
+        self.doc_freq = np.bincount(self.term_counts.indices, minlength=self.term_counts.shape[1])
+        self.vocabulary = self.count_vectorizer.vocabulary_
+        self.analyzer = self.count_vectorizer.build_analyzer()
+
+        # Inverted index (term -> templates) and squared document norms under the idf and
+        # max_features selection of a query sharing no terms with the corpus
+        self.postings = self.term_counts.tocsc()
+        self.base_kept = self._select_terms(self.term_totals)
+        base_idf = np.log((1 + self._n_docs()) / (1 + self.doc_freq)) + 1
+        self.base_idf_sq = base_idf ** 2 * self.base_kept
+        self.base_norm_sq = self.term_counts_sq @ self.base_idf_sq
+
+    def _build_embeddings(self, embeddings, embedding_dtype, keep_source_embeddings):
+        """Store L2-normalised template embeddings so cosine similarity is a dot product.
+
+        ``source_embeddings`` holds float32 rows a later build can reuse for
+        unchanged templates: the stored matrix itself when it is float32, the
+        encoder output when ``keep_source_embeddings`` asks for it alongside a
+        float16/int8 matrix (rebuilding from those rows would round them twice),
+        and None otherwise.
+        """
+        self.source_embeddings = None
+        if embeddings is None or len(embeddings) == 0:
+            self.embeddings = None
+            return
+
+        self.embeddings = EmbeddingMatrix(normalise_rows(embeddings), dtype=embedding_dtype)
+        if embedding_dtype == 'float32':
+            self.source_embeddings = self.embeddings.values
+        elif keep_source_embeddings:
+            self.source_embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    def _query_term_counts(self, processed_queries):
+        """Sparse in-vocabulary term counts per query, plus each query's {term: count} of query-only terms"""
+        rows, cols, counts = [], [], []
+        new_terms = [{} for _ in processed_queries]
+        for row, query in enumerate(processed_queries):
+            for term, count in Counter(self.analyzer(query)).items():
+                col = self.vocabulary.get(term)
+                if col is None:
+                    new_terms[row][term] = count
+                else:
+                    rows.append(row)
+                    cols.append(col)
+                    counts.append(count)
+
+        query_counts = sparse.csr_matrix(
+            (counts, (rows, cols)),
+            shape=(len(processed_queries), self.term_counts.shape[1]),
+            dtype=np.float64,
+        )
+        return query_counts, new_terms
+
+    def _select_terms(self, term_totals):
+        """Terms a fit with these total counts keeps under max_features, as a boolean mask.
+
+        Mirrors CountVectorizer._limit_features, including its (unstable)
+        argsort, so ties at the cut-off are broken exactly as a refit breaks them.
+        """
+        kept = np.ones(len(term_totals), dtype=bool)
+        if self.max_features is not None and len(term_totals) > self.max_features:
+            kept[:] = False
+            kept[(-term_totals).argsort()[:self.max_features]] = True
+        return kept
+
+    def _query_weights(self, processed_queries):
+        """Query term counts, squared idf per (query, term) and squared query norms.
+
+        Reproduces a refit on corpus + query: the query counts as one more
+        document for idf, query-only terms join the vocabulary with df=1, and
+        when the combined vocabulary exceeds max_features only the terms that
+        fit would keep get weight. Terms a query's fit drops have idf 0 in its row.
+        """
+        n_docs = self._n_docs()
+        query_counts, new_terms = self._query_term_counts(processed_queries)
+
+        # Smoothed idf with each query included as a document
+        presence = (query_counts > 0).toarray()
+        idf_sq = (np.log((1 + n_docs) / (1 + self.doc_freq + presence)) + 1) ** 2
+        new_idf_sq = (np.log((1 + n_docs) / 2) + 1) ** 2
+
+        query_sq = np.zeros(len(processed_queries))
+        for row, row_new_terms in enumerate(new_terms):
+            start, stop = query_counts.indptr[row], query_counts.indptr[row + 1]
+            cols, counts = query_counts.indices[start:stop], query_counts.data[start:stop]
+            terms = np.array(sorted(row_new_terms), dtype=object)
+            term_counts = np.array([row_new_terms[term] for term in terms], dtype=np.int64)
+            new_kept = np.ones(len(terms), dtype=bool)
+
+            if self.max_features is not None and len(self.terms) + len(terms) > self.max_features:
+                # Column totals of the refit, with query-only terms at their sorted positions
+                totals = self.term_totals.copy()
+                totals[cols] += counts.astype(np.int64)
+                positions = np.searchsorted(self.terms, terms)
+                totals = np.insert(totals, positions, term_counts)
+                is_new = np.zeros(len(totals), dtype=bool)
+                is_new[positions + np.arange(len(terms))] = True
+
+                kept = self._select_terms(totals)
+                idf_sq[row] *= kept[~is_new]
+                new_kept = kept[is_new]
+
+            query_sq[row] = (counts ** 2 * idf_sq[row, cols]).sum() + (term_counts[new_kept] ** 2).sum() * new_idf_sq
+        return query_counts, idf_sq, query_sq
+
+    def tfidf_scores(self, processed_queries, template_ids=None):
+        """TF-IDF cosine similarity of each query against every template, one row per query.
+
+        The original per-query path fitted the vectorizer on corpus + query, so
+        the query counted as one extra document for idf and max_features picked
+        the most frequent terms of corpus + query. Both are reproduced from the
+        stored term counts (see _query_weights), so scores match the refit.
+        With ``template_ids`` only those templates are scored (one column each),
+        under the same whole-corpus idf.
+        """
+        if self.term_counts is None:
+            return np.array([])
+
+        query_counts, idf_sq, query_sq = self._query_weights(processed_queries)
+
+        term_counts, term_counts_sq = self.term_counts, self.term_counts_sq
+        if template_ids is not None:
+            term_counts, term_counts_sq = term_counts[template_ids], term_counts_sq[template_ids]
+
+        doc_norms = np.sqrt(term_counts_sq @ idf_sq.T)
+        dots = (term_counts @ query_counts.multiply(idf_sq).tocsr().T).toarray()
+
+        denom = doc_norms * np.sqrt(query_sq)
+        scores = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+        return scores.T
+
+    def _n_docs(self):
+        """Documents in the refit the scores reproduce: the corpus plus the query"""
+        return self.term_counts.shape[0] + 1
+
+    def _matching_templates(self, entry_templates):
+        """Sorted distinct template ids among posting entries"""
+        n_templates = self.term_counts.shape[0]
+        if len(entry_templates) * 16 < n_templates:
+            # Short postings: sort the matched templates rather than touch every template
+            return np.unique(entry_templates)
+        # Common terms: counting into a catalog-sized array is cheaper than sorting
+        return np.flatnonzero(np.bincount(entry_templates, minlength=n_templates))
+
+    def _sum_by_template(self, entry_templates, weights, template_ids):
+        """Sum posting-entry ``weights`` per template, for the sorted ``template_ids`` only"""
+        n_templates = self.term_counts.shape[0]
+        if len(entry_templates) * 16 >= n_templates:
+            return np.bincount(entry_templates, weights=weights, minlength=n_templates)[template_ids]
+        positions = np.searchsorted(template_ids, entry_templates)
+        found = positions < len(template_ids)
+        found[found] = template_ids[positions[found]] == entry_templates[found]
+        return np.bincount(positions[found], weights=weights[found], minlength=len(template_ids))
+
+    def lexical_candidates(self, processed_queries, max_candidates):
+        """Best-scoring templates sharing a term with each query, as (template ids, TF-IDF scores).
+
+        Only the postings of each query's terms are read (plus, above the
+        max_features cap, those of terms the query's refit would keep or drop
+        differently), so the cost follows how common the query terms are rather
+        than the catalog size. Scores equal tfidf_scores for the returned
+        templates; every template left out either scores 0 or ranks below the
+        ``max_candidates`` kept.
+        """
+        empty = (np.empty(0, dtype=np.intp), np.empty(0))
+        if self.term_counts is None:
+            return [empty for _ in processed_queries]
+
+        query_counts, idf_sq, query_sq = self._query_weights(processed_queries)
+
+        results = []
+        for row in range(len(processed_queries)):
+            start, stop = query_counts.indptr[row], query_counts.indptr[row + 1]
+            query_terms, counts = query_counts.indices[start:stop], query_counts.data[start:stop]
+            row_idf_sq = idf_sq[row]
+            live = row_idf_sq[query_terms] > 0
+            terms, counts = query_terms[live], counts[live]
+            if len(terms) == 0:
+                results.append(empty)
+                continue
+
+            # Templates sharing a weighted term with the query, and their dot products
+            postings = self.postings[:, terms]
+            term_of_entry = np.repeat(np.arange(len(terms)), np.diff(postings.indptr))
+            template_ids = self._matching_templates(postings.indices)
+            dots = self._sum_by_template(
+                postings.indices, postings.data * (counts * row_idf_sq[terms])[term_of_entry], template_ids
+            )
+
+            # Norms differ from the stored base norms only on the query's own terms and
+            # on terms its max_features selection keeps or drops differently
+            shifted = query_terms
+            if self.max_features is not None:
+                shifted = np.union1d(query_terms, np.flatnonzero((row_idf_sq > 0) != self.base_kept))
+            shift_postings = self.postings[:, shifted]
+            term_of_entry = np.repeat(np.arange(len(shifted)), np.diff(shift_postings.indptr))
+            weights = (row_idf_sq[shifted] - self.base_idf_sq[shifted])[term_of_entry]
+            norm_shift = self._sum_by_template(
+                shift_postings.indices, shift_postings.data ** 2 * weights, template_ids
+            )
+
+            # Clipped at 0: the shift can undershoot by rounding when it removes a whole norm
+            doc_norm_sq = np.maximum(self.base_norm_sq[template_ids] + norm_shift, 0)
+            denom = np.sqrt(doc_norm_sq) * np.sqrt(query_sq[row])
+            scores = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+            if len(template_ids) > max_candidates:
+                keep = np.argpartition(-scores, max_candidates - 1)[:max_candidates]
+                template_ids, scores = template_ids[keep], scores[keep]
+            results.append((template_ids, scores))
+        return results
+
+    def dense_candidates(self, query_embedding, n_candidates, exclude=None):
+        """Top templates by embedding similarity to one query, skipping ``exclude``; via ANN when built"""
+        if self.embeddings is None or n_candidates <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        query = normalise_rows(query_embedding)
+        n_excluded = 0 if exclude is None else len(exclude)
+        wanted = min(len(self.embeddings), n_candidates + n_excluded)
+        if self.ann is not None:
+            template_ids = self.ann.search(query, top_k=wanted)[0]
+        else:
+            template_ids = top_k_indices(self.embeddings.dot(query), wanted)[0]
+        if n_excluded:
+            template_ids = template_ids[~np.isin(template_ids, exclude)]
+        return template_ids[:n_candidates]
+
+    def candidate_semantic_scores(self, query_embedding, template_ids):
+        """Cosine similarity of one encoded query against the given templates only"""
+        return self.embeddings[template_ids] @ normalise_rows(query_embedding)[0]
+
+    def build_ann(self, **params):
+        """Build an IVF approximate nearest-neighbour index over the template embeddings"""
+        if self.embeddings is not None:
+            self.ann = IVFIndex(self.embeddings, **params)
+        return self.ann
+
+    def semantic_scores(self, query_embeddings, exact=False, must_score=None, template_ids=None):
+        """Cosine similarity of each encoded query against every template embedding, one row per query.
+
+        With an ANN index built (and ``exact`` unset) only the probed clusters are
+        scored and every other template gets -inf, except where ``must_score``
+        (a boolean array shaped like the result) asks for an exact score.
+        ``template_ids`` restricts scoring to those templates, always exactly.
+        """
+        if self.embeddings is None:
+            return np.array([])
+
+        query_embeddings = normalise_rows(query_embeddings)
+
+        if template_ids is not None:
+            return self.embeddings.dot(query_embeddings, rows=template_ids)
+        if self.ann is None or exact:
+            return self.embeddings.dot(query_embeddings)
+
+        scores = self.ann.partial_scores(query_embeddings)
+        if must_score is not None:
+            rows, cols = np.nonzero(must_score & np.isneginf(scores))
+            scores[rows, cols] = np.einsum('ij,ij->i', query_embeddings[rows], self.embeddings[cols])
+        return scores
+
+
+def top_k_indices(scores, top_k):
+    """Column indices of the ``top_k`` highest scores in each row, best first"""
+    n_rows, n_cols = scores.shape
+    top_k = n_cols if top_k is None else max(0, min(top_k, n_cols))
+    if top_k == 0:
+        return np.empty((n_rows, 0), dtype=np.intp)
+
+    if top_k < n_cols:
+        candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    else:
+        candidates = np.tile(np.arange(n_cols), (n_rows, 1))
+    # Ties go to the later column, as with the previous argsort(...)[::-1]
+    order = np.lexsort((-candidates, -np.take_along_axis(scores, candidates, axis=1)), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
@@ -0,0 +1,465 @@
+# search_service.py
+"""Asyncio HTTP search service with request micro-batching.
+
+Concurrent requests are collected for up to ``max_wait_ms`` (or until
+``max_batch_size`` queries are waiting), scored together by
+TemplateFinder.find_similar_templates_batch on a single worker thread, and
+the results are fanned back out to the waiting requests. One model copy then
+serves every Streamlit session with a few batched encode calls instead of
+many single-query ones.
+
+    python search_service.py --port 8765 --max-batch-size 32 --max-wait-ms 5
+
+Endpoints (JSON in, JSON out):
+
+    POST /search   {"query": "...", "top_k": 20, "filters": {"industry": "Automotive", "min_avg_ctr": 1.5}}
+    POST /suggest  {"prefix": "...", "limit": 8} keyword autocomplete
+    POST /reload   pull new sheet rows in the background and swap in a rebuilt index
+    GET  /facets   filter values per facet and the avg_ctr range
+    GET  /health   search mode, data version, template count and the last reload report
+    GET  /stats    batching and result-cache counters
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+
+import pandas as pd
+import requests
+
+from catalog import RESULT_COLUMNS
+from facets import normalise_filters
+from instrumentation import NULL_INSTRUMENTATION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1 << 20
+
+
+class MicroBatcher:
+    """Coalesce concurrent search calls into batched TemplateFinder calls"""
+
+    def __init__(self, template_finder, max_batch_size=32, max_wait_ms=5.0):
+        self.template_finder = template_finder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.queries = 0
+        self.largest_batch = 0
+        self._queue = None
+        self._task = None
+        # One worker thread: batches are scored one at a time while the next one fills up
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search-batch')
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def search(self, query, top_k=20, filters=None):
+        """Queue one query and wait for its recommendations dataframe"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, top_k, normalise_filters(filters), future))
+        return await future
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the window closes or the batch is full"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.batches += 1
+            self.queries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            # find_similar_templates_batch takes one top_k and one set of filters,
+            # so score each distinct combination together
+            groups = {}
+            for query, top_k, filters, future in batch:
+                groups.setdefault((top_k, filters), []).append((query, future))
+
+            for (top_k, filters), items in groups.items():
+                queries = [query for query, _ in items]
+                try:
+                    results = await loop.run_in_executor(
+                        self._executor, partial(
+                            self.template_finder.find_similar_templates_batch, queries, top_k, filters=dict(filters)
+                        )
+                    )
+                except Exception as e:
+                    logger.exception("Batch search failed")
+                    results = [e] * len(items)
+
+                for (_, future), result in zip(items, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'queries': self.queries,
+            'mean_batch_size': self.queries / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+        }
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _records(recommendations):
+    """JSON-safe result rows, as bulk_recommend writes them"""
+    if recommendations.empty:
+        return []
+    return json.loads(recommendations.to_json(orient='records'))
+
+
+class SearchService:
+    """Minimal HTTP/1.1 JSON server (keep-alive aware) in front of a MicroBatcher"""
+
+    def __init__(self, template_finder, data_loader=None, host='127.0.0.1', port=DEFAULT_PORT,
+                 max_batch_size=32, max_wait_ms=5.0, refresh_check_interval=30):
+        self.template_finder = template_finder
+        self.data_loader = data_loader
+        self.host = host
+        self.port = port
+        self.refresh_check_interval = refresh_check_interval
+        self.batcher = MicroBatcher(template_finder, max_batch_size, max_wait_ms)
+        self._server = None
+        self._refresh_task = None
+
+    async def start(self):
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # Report the bound port (useful with port=0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.data_loader is not None and self.refresh_check_interval:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+        logger.info("Search service listening on http://%s:%d", self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _refresh_loop(self):
+        """Revalidate sheet data periodically, as app.py does on each rerun"""
+        while True:
+            await asyncio.sleep(self.refresh_check_interval)
+            self.data_loader.maybe_refresh()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                try:
+                    status, payload = await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    logger.exception("Search request failed")
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as e:
+            self._write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Parse one request; returns None when the client closed the connection"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed Content-Length header")
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed Content-Length header")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target.split('?', 1)[0], headers, body
+
+    def _write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        status = HTTPStatus(status)
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+
+    async def _dispatch(self, method, path, body):
+        if path == '/search' and method == 'POST':
+            return HTTPStatus.OK, await self._search(body)
+        if path == '/suggest' and method == 'POST':
+            return HTTPStatus.OK, self._suggest(body)
+        if path == '/reload' and method == 'POST':
+            return HTTPStatus.ACCEPTED, self._reload()
+        if path == '/facets' and method == 'GET':
+            return HTTPStatus.OK, self.template_finder.get_facet_options()
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, self._health()
+        if path == '/stats' and method == 'GET':
+            return HTTPStatus.OK, self._stats()
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    @staticmethod
+    def _json_body(body):
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+        if not isinstance(request, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return request
+    
+    def _suggest(self, body):
+        request = self._json_body(body)
+        prefix = request.get('prefix')
+        limit = request.get('limit', 8)
+        if not isinstance(prefix, str) or not isinstance(limit, int):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'prefix' must be a string and 'limit' an integer")
+        if not prefix.strip():
+            popular = self.template_finder.get_popular_keywords(limit)
+            return {'prefix': prefix, 'suggestions': [keyword for keyword, _ in popular if keyword]}
+        return {'prefix': prefix, 'suggestions': self.template_finder.suggest_keywords(prefix, limit)}
+    
+    async def _search(self, body):
+        request = self._json_body(body)
+        query = request.get('query')
+        if not isinstance(query, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'query' must be a string")
+        top_k = request.get('top_k', 20)
+        if not isinstance(top_k, int) or top_k < 1:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'top_k' must be a positive integer")
+        filters = request.get('filters') or {}
+        if not isinstance(filters, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'filters' must be a JSON object")
+        try:
+            normalise_filters(filters)
+        except (TypeError, ValueError) as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+        recommendations = await self.batcher.search(query, top_k, filters)
+        return {
+            'query': query,
+            'search_mode': recommendations.attrs.get('search_mode'),
+            'model_ready': self.template_finder.model_ready.is_set(),
+            'results': _records(recommendations),
+        }
+
+    def _reload(self):
+        if self.data_loader is None:
+            raise HTTPError(HTTPStatus.CONFLICT, "This service has no data loader to reload from")
+        self.data_loader.refresh_async()
+        return {'reloading': True}
+    
+    def _health(self):
+        index = self.template_finder.index
+        return {
+            'status': 'ok' if index is not None else 'building',
+            'search_mode': self.template_finder.search_mode(),
+            'model_ready': self.template_finder.model_ready.is_set(),
+            'data_version': None if index is None else index.data_version,
+            'templates': 0 if index is None else len(index),
+            'reloading': self.data_loader is not None and self.data_loader.is_refreshing(),
+            'last_reload': self.template_finder.last_reload,
+        }
+
+    def _stats(self):
+        stats = {'batching': self.batcher.stats()}
+        if self.template_finder.result_cache is not None:
+            stats['result_cache'] = self.template_finder.result_cache.stats()
+        return stats
+
+
+class SearchClient:
+    """Blocking client for SearchService with the TemplateFinder surface app.py uses.
+
+    Lets the Streamlit app query a shared search service instead of loading
+    its own model. Result caching happens in the service, so ``result_cache``
+    is accepted for signature compatibility and ignored.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.model_ready = threading.Event()
+        self.result_cache = None
+        self.instrumentation = NULL_INSTRUMENTATION
+        self._search_mode = 'tfidf'
+
+    def _update(self, payload):
+        self._search_mode = payload.get('search_mode') or self._search_mode
+        if payload.get('model_ready'):
+            self.model_ready.set()
+
+    def health(self):
+        response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+        response.raise_for_status()
+        payload = response.json()
+        self._update(payload)
+        return payload
+
+    def search_mode(self):
+        return self._search_mode
+
+    def suggest_keywords(self, prefix, limit=8):
+        response = self.session.post(
+            f"{self.base_url}/suggest", json={'prefix': prefix, 'limit': limit}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()['suggestions']
+    
+    def get_popular_keywords(self, top_n=10):
+        """Popular keywords without counts; the service only returns the phrases"""
+        return [(keyword, None) for keyword in self.suggest_keywords('', top_n)]
+    
+    def get_facet_options(self):
+        response = self.session.get(f"{self.base_url}/facets", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    def find_similar_templates(self, query, top_k=20, result_cache=None, filters=None):
+        response = self.session.post(
+            f"{self.base_url}/search", json={'query': query, 'top_k': top_k, 'filters': filters or {}},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        self._update(payload)
+
+        if payload['results']:
+            recommendations = pd.DataFrame(payload['results'], columns=RESULT_COLUMNS)
+        else:
+            recommendations = pd.DataFrame()
+        recommendations.attrs['search_mode'] = payload.get('search_mode')
+        return recommendations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching HTTP search service for TemplateFinder")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=32, help="most queries scored in one pass")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help="how long to hold a batch open")
+    parser.add_argument('--credentials', default=None, help="service account JSON key (defaults to Streamlit secrets)")
+    parser.add_argument('--backend', default='float32', help="embedding backend ('float32' or 'int8')")
+    parser.add_argument('--threads', type=int, default=None, help="torch CPU threads for encoding")
+    parser.add_argument('--embedding-dtype', default='float32', help="template embedding storage type")
+    parser.add_argument('--retrieval', default='full', help="'full' or cascaded 'cascade' retrieval")
+    parser.add_argument('--cascade-candidates', type=int, default=200, help="templates re-ranked per cascaded query")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    # Deferred so the batcher and client can be imported without the Sheets/model stack
+    from data_loader import DEFAULT_SNAPSHOT_DIR, DataLoader
+    from embedding_backend import cache_model_name
+    from embedding_cache import DEFAULT_CACHE_DIR, EmbeddingCache
+    from finder import TemplateFinder
+    from query_cache import QueryResultCache
+
+    data_loader = DataLoader(snapshot_dir=DEFAULT_SNAPSHOT_DIR, max_staleness=24 * 60 * 60)
+    if not data_loader.authenticate_gspread(args.credentials) or not data_loader.load_data():
+        print("Failed to load data from Google Sheets", file=sys.stderr)
+        return 1
+
+    template_finder = TemplateFinder(
+        data_loader,
+        embedding_cache=EmbeddingCache(DEFAULT_CACHE_DIR, cache_model_name(TemplateFinder.MODEL_NAME, args.backend)),
+        result_cache=QueryResultCache(),
+        embedding_backend=args.backend,
+        num_threads=args.threads,
+        embedding_dtype=args.embedding_dtype,
+        retrieval=args.retrieval,
+        cascade_candidates=args.cascade_candidates,
+    )
+    data_loader.add_listener(lambda loader: template_finder.build_index())
+    template_finder.build_index()
+
+    service = SearchService(
+        template_finder, data_loader, args.host, args.port, args.max_batch_size, args.max_wait_ms
+    )
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# tests/test_app.py
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+from benchmarks.app_rerun import stop_service
+from benchmarks.pipeline_benchmark import HashingEncoder
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+
+AppTest = pytest.importorskip('streamlit.testing.v1').AppTest
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / 'app.py')
+
+
+class ServiceRunner:
+    """SearchServices on a background event loop, with app.py pointed at the latest one"""
+
+    def __init__(self, monkeypatch):
+        self.monkeypatch = monkeypatch
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name='search-service', daemon=True).start()
+        self.services = []
+
+    def start(self, sheets):
+        from finder import TemplateFinder
+        from search_service import SearchService
+
+        template_finder = TemplateFinder(InMemoryDataLoader(*sheets), sentence_model=HashingEncoder())
+        template_finder.build_index()
+        service = asyncio.run_coroutine_threadsafe(
+            SearchService(template_finder, host='127.0.0.1', port=0).start(), self.loop
+        ).result()
+        self.services.append(service)
+        self.monkeypatch.setenv('TEMPLATE_SEARCH_URL', f"http://127.0.0.1:{service.port}")
+        return service
+
+    def stop(self, service):
+        if service in self.services:
+            self.services.remove(service)
+            asyncio.run_coroutine_threadsafe(stop_service(service), self.loop).result(timeout=5)
+
+    def close(self):
+        for service in list(self.services):
+            self.stop(service)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+@pytest.fixture
+def services(monkeypatch):
+    import streamlit as st
+
+    # init_components is cached per process; drop the client pointing at another test's service
+    st.cache_resource.clear()
+    runner = ServiceRunner(monkeypatch)
+    yield runner
+    st.cache_resource.clear()
+    runner.close()
+
+
+def test_filters_render_without_ctr_slider_when_no_ctr_is_positive(services):
+    client_profiles, template_tags, template_details = generate_sheets(60)
+    template_details['avg_ctr'] = 0.0
+    services.start((client_profiles, template_tags, template_details))
+
+    app = AppTest.from_file(APP_PATH, default_timeout=30).run()
+
+    assert not app.exception
+    assert not app.slider
+    assert [multiselect.key for multiselect in app.multiselect] == [
+        'filter_industry', 'filter_business_niche', 'filter_client'
+    ]
+    assert not app.error
+
+
+def test_ctr_slider_renders_when_some_ctr_is_positive(services):
+    services.start(generate_sheets(60))
+
+    app = AppTest.from_file(APP_PATH, default_timeout=30).run()
+
+    assert not app.exception
+    assert [slider.key for slider in app.slider] == ['filter_min_avg_ctr']
+
+
+def test_search_service_outage_after_startup_shows_an_error(services):
+    service = services.start(generate_sheets(60))
+    app = AppTest.from_file(APP_PATH, default_timeout=30).run()
+    assert not app.exception and app.multiselect
+
+    # The cached SearchClient now points at a service that is gone
+    services.stop(service)
+    # AppTest cannot send an unselected single-select st.pills (the suggestions) back as None
+    for button_group in app.get('button_group'):
+        button_group.set_value([])
+    app.text_input(key='query').input('cricket quiz').run()
+
+    assert not app.exception
+    assert not app.multiselect
+    assert not app.get('button_group')
+    assert [error.value for error in app.error] == [
+        "❌ The search service is not responding. Please try again in a moment."
+    ]
@@ -0,0 +1,223 @@
+# tests/test_data_loader.py
+import io
+import json
+
+import gspread
+import pandas as pd
+import pytest
+import requests
+
+from benchmarks.synthetic import generate_sheets
+from data_loader import SHEET_NAMES, DataLoader, _arrow_safe, _frame_from_values
+from fake_sheets import FakeSheetsClient, FakeWorksheet
+
+
+def sheets_client(n_templates=40, seed=0, latency=0.0):
+    return FakeSheetsClient.from_frames(*generate_sheets(n_templates, seed=seed), latency=latency)
+
+
+def write_snapshot(snapshot_dir, client):
+    """Fetch once with a blocking load so snapshot_dir holds the client's current data"""
+    data_loader = DataLoader(gc=client, snapshot_dir=str(snapshot_dir))
+    assert data_loader.load_data()
+    return data_loader.data_version
+
+
+def add_template(client):
+    """Append one row to the template details sheet, as an edit in the live sheet would"""
+    worksheet = client.worksheets[SHEET_NAMES['template_details']]
+    header = worksheet.values[0]
+    records = [dict(zip(header, row)) for row in worksheet.values[1:]]
+    records.append({**records[0], 'template_name': 'Brand New Template'})
+    client.update_sheet(worksheet.title, records)
+
+
+def api_error(status):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({'error': {'code': status, 'message': 'simulated'}}).encode('utf-8')
+    return gspread.exceptions.APIError(response)
+
+
+def failing(errors, result='ok'):
+    """A callable raising each of ``errors`` in turn, then returning ``result``; counts its calls"""
+    errors = list(errors)
+
+    def call():
+        call.calls += 1
+        if errors:
+            raise errors.pop(0)
+        return result
+    call.calls = 0
+    return call
+
+
+def test_fresh_snapshot_is_served_then_revalidated_in_background(tmp_path):
+    snapshot_version = write_snapshot(tmp_path, sheets_client())
+
+    client = sheets_client(latency=0.2)
+    add_template(client)
+    data_loader = DataLoader(gc=client, snapshot_dir=str(tmp_path), max_staleness=3600)
+    changes = []
+    data_loader.add_listener(lambda loader: changes.append(loader.data_version))
+
+    assert data_loader.load_data()
+    # The snapshot is served without waiting on Sheets
+    assert data_loader.data_version == snapshot_version
+    assert data_loader.is_refreshing()
+
+    data_loader._refresh_thread.join(timeout=10)
+    assert client.batch_calls == 1
+    assert data_loader.last_refresh_error is None
+    assert data_loader.data_version != snapshot_version
+    assert changes == [data_loader.data_version]
+    assert 'Brand New Template' in set(data_loader.template_details['template_name'])
+
+
+def test_stale_snapshot_forces_blocking_fetch(tmp_path):
+    snapshot_version = write_snapshot(tmp_path, sheets_client())
+
+    client = sheets_client()
+    add_template(client)
+    data_loader = DataLoader(gc=client, snapshot_dir=str(tmp_path), max_staleness=0)
+
+    assert data_loader.load_data()
+    assert client.batch_calls == 1
+    assert not data_loader.is_refreshing()
+    assert data_loader.data_version != snapshot_version
+    assert 'Brand New Template' in set(data_loader.template_details['template_name'])
+
+
+def test_manifest_missing_keys_falls_back_to_sheets(tmp_path):
+    write_snapshot(tmp_path, sheets_client())
+    manifest_path = tmp_path / 'snapshot.json'
+    manifest = json.loads(manifest_path.read_text())
+    del manifest['fetched_at']
+    manifest_path.write_text(json.dumps(manifest))
+
+    client = sheets_client()
+    data_loader = DataLoader(gc=client, snapshot_dir=str(tmp_path), max_staleness=3600)
+
+    assert data_loader.load_data()
+    assert client.batch_calls == 1
+    assert data_loader.fetched_at is not None
+
+
+def test_refresh_swaps_data_and_notifies_listeners_only_on_version_change():
+    client = sheets_client()
+    data_loader = DataLoader(gc=client)
+    assert data_loader.load_data()
+    changes = []
+    data_loader.add_listener(lambda loader: changes.append(loader.data_version))
+    first_version = data_loader.data_version
+
+    add_template(client)
+    assert data_loader.refresh()
+    assert data_loader.data_version != first_version
+    assert changes == [data_loader.data_version]
+    assert data_loader.last_diff['template_details']['added'] == 1
+    assert data_loader.last_diff['template_details']['removed'] == 0
+    assert data_loader.last_diff['template_tags']['added'] == 0
+
+    client_profiles, template_tags, template_details, version = data_loader.frames()
+    assert version == data_loader.data_version
+    assert 'Brand New Template' in set(template_details['template_name'])
+
+
+def test_unchanged_data_keeps_version():
+    client = sheets_client()
+    data_loader = DataLoader(gc=client)
+    assert data_loader.load_data()
+    changes = []
+    data_loader.add_listener(lambda loader: changes.append(loader.data_version))
+    version, fetched_at, template_details = (
+        data_loader.data_version, data_loader.fetched_at, data_loader.template_details
+    )
+
+    assert not data_loader.refresh()
+    assert client.batch_calls == 2
+    assert data_loader.data_version == version
+    assert data_loader.template_details is template_details
+    assert data_loader.fetched_at >= fetched_at
+    assert changes == []
+
+
+def test_transient_failures_are_retried_until_success():
+    client = sheets_client()
+    client.fail_next = 3
+    data_loader = DataLoader(gc=client, max_retries=4, retry_base_delay=0.001)
+
+    assert data_loader.load_data()
+    assert client.fail_next == 0
+    assert client.batch_calls == 1
+    assert len(data_loader.template_details) == 40
+
+    call = failing([api_error(429), api_error(503), TimeoutError()])
+    assert data_loader._with_retries(call) == 'ok'
+    assert call.calls == 4
+
+
+def test_retries_give_up_after_max_retries():
+    data_loader = DataLoader(gc=sheets_client(), max_retries=2, retry_base_delay=0.001)
+    call = failing([ConnectionError()] * 3)
+
+    with pytest.raises(ConnectionError):
+        data_loader._with_retries(call)
+    assert call.calls == 3
+
+
+@pytest.mark.parametrize('error', [api_error(400), api_error(403), ValueError('bad range'), KeyError('sheet')])
+def test_non_transient_errors_are_not_retried(error):
+    data_loader = DataLoader(gc=sheets_client(), max_retries=4, retry_base_delay=0.001)
+    call = failing([error])
+
+    with pytest.raises(type(error)):
+        data_loader._with_retries(call)
+    assert call.calls == 1
+
+
+def records_frame(values):
+    """What the loader built before it parsed raw values: a frame of get_all_records()"""
+    worksheet = FakeWorksheet('Sheet', [])
+    worksheet.values = values
+    return pd.DataFrame(worksheet.get_all_records())
+
+
+@pytest.mark.parametrize('values', [
+    # Ragged rows: trailing empty cells are omitted by the API, and a row may be wider than the header
+    [['name', 'ctr', 'notes'], ['Alpha', '1.5'], ['Beta'], ['Gamma', '2', 'x', 'extra'], ['Delta', '', '']],
+    [['name', 'clicks'], ['Alpha', '1,200'], ['Beta', '007'], ['Gamma', '3.0'], ['Delta', 'TRUE']],
+    [['name', 'clicks']],
+    [],
+])
+def test_frame_from_values_matches_get_all_records(values):
+    pd.testing.assert_frame_equal(_frame_from_values(values), records_frame(values))
+
+
+def test_frame_from_values_rejects_duplicate_header_like_get_all_records():
+    values = [['name', 'ctr', 'name'], ['Alpha', '1', 'Beta']]
+
+    with pytest.raises(gspread.exceptions.GSpreadException, match='duplicates') as expected:
+        records_frame(values)
+    with pytest.raises(gspread.exceptions.GSpreadException) as raised:
+        _frame_from_values(values)
+    assert str(raised.value) == str(expected.value)
+
+    # Blank header cells count too, as they do for get_all_records
+    with pytest.raises(gspread.exceptions.GSpreadException):
+        _frame_from_values([['name', '', ''], ['Alpha', '1', '2']])
+
+
+def test_arrow_safe_stringifies_only_mixed_type_columns():
+    values = [['name', 'ctr', 'clicks'], ['Alpha', '1.5', '10'], ['Beta', '', '20'], ['Gamma', '2', '30']]
+    records = records_frame(values)
+    frame = _arrow_safe(_frame_from_values(values))
+
+    # 'ctr' mixes floats, ints and '' from the blank cell: deliberately stored as strings
+    assert records['ctr'].tolist() == [1.5, '', 2]
+    assert frame['ctr'].tolist() == ['1.5', '', '2']
+    # Single-type columns keep the values get_all_records gives
+    pd.testing.assert_series_equal(frame['name'], records['name'])
+    pd.testing.assert_series_equal(frame['clicks'], records['clicks'])
+    # Every column now round-trips through Parquet
+    frame.to_parquet(io.BytesIO())
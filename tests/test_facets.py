@@ -0,0 +1,80 @@
+# tests/test_facets.py
+import numpy as np
+import pandas as pd
+
+from benchmarks.pipeline_benchmark import HashingEncoder
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+from finder import TemplateFinder
+
+
+def build_finder(client_profiles, template_tags, template_details):
+    template_finder = TemplateFinder(
+        InMemoryDataLoader(client_profiles, template_tags, template_details), sentence_model=HashingEncoder()
+    )
+    template_finder.build_index()
+    return template_finder
+
+
+def profile_values(client_profiles, clients, field):
+    """Brute-force facet values: every profile whose client_type contains one of the clients"""
+    values = set()
+    for client in clients:
+        rows = client_profiles['client_type'].str.contains(client, case=False, na=False, regex=False)
+        for cell in client_profiles.loc[rows, field].dropna():
+            values.update(value.strip().lower() for value in str(cell).split(','))
+    return values
+
+
+def test_facet_membership_follows_matched_client_profiles():
+    client_profiles, template_tags, template_details = generate_sheets(300, seed=2)
+    index = build_finder(client_profiles, template_tags, template_details).index
+
+    for template_id in [0, 5, 123, 299]:
+        clients = index.template_info[template_id]['associated_clients']
+        for facet in ('industry', 'business_niche'):
+            member_of = {
+                value.lower() for value in index.facets.values[facet]
+                if index.facets.mask({facet: value})[template_id]
+            }
+            assert member_of == profile_values(client_profiles, clients, facet)
+
+
+def test_blank_client_names_are_not_facet_values():
+    client_profiles, template_tags, template_details = generate_sheets(200, seed=3)
+    template_name = template_details['template_name'].iloc[0]
+    # Sheets hand blank cells back as '' (or whitespace), never NaN
+    blank_tags = pd.DataFrame({
+        'campaign_name': ['Blank 1', 'Blank 2'],
+        'client_name': ['', '  '],
+        'template_name': [template_name, template_name],
+        'preview_url': ['', ''],
+    })
+    template_finder = build_finder(
+        client_profiles, pd.concat([template_tags, blank_tags], ignore_index=True), template_details
+    )
+    index = template_finder.index
+    template_id = index.catalog.name_to_id[template_name]
+
+    options = template_finder.get_facet_options()
+    assert all(client.strip() for client in options['client'])
+
+    named_clients = [client for client in index.template_info[template_id]['associated_clients'] if client.strip()]
+    industries = [value for value in options['industry'] if index.facets.mask({'industry': value})[template_id]]
+    assert {value.lower() for value in industries} == profile_values(client_profiles, named_clients, 'industry')
+    assert len(industries) < len(options['industry'])
+
+
+def test_filters_combine_facets_and_minimum_ctr():
+    client_profiles, template_tags, template_details = generate_sheets(300, seed=4)
+    template_details['avg_ctr'] = template_details['avg_ctr'].astype(object)
+    template_details.loc[0, 'avg_ctr'] = 'N/A'
+    index = build_finder(client_profiles, template_tags, template_details).index
+    facets = index.facets
+
+    industry = facets.values['industry'][0]
+    mask = facets.mask({'industry': [industry.upper(), 'no such industry'], 'min_avg_ctr': 1.0})
+    expected = facets.mask({'industry': industry}) & (facets.avg_ctr >= 1.0)
+    assert np.array_equal(mask, expected)
+    assert not mask[0]
+    assert facets.mask({'industry': 'no such industry'}).sum() == 0
+    assert facets.mask({'industry': None, 'client': []}) is None
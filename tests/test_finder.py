@@ -0,0 +1,91 @@
+# tests/test_finder.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.pipeline_benchmark import HashingEncoder
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+from finder import TemplateFinder
+
+QUERIES = ['cricket quiz for ev launch', 'festive sale carousel', 'weather trigger banner for skincare', 'zzz qqq']
+
+
+def build_finder(retrieval, n_templates=300, cascade_candidates=50, seed=1):
+    template_finder = TemplateFinder(
+        InMemoryDataLoader(*generate_sheets(n_templates, seed=seed)),
+        sentence_model=HashingEncoder(seed=seed),
+        retrieval=retrieval,
+        cascade_candidates=cascade_candidates,
+    )
+    template_finder.build_index()
+    return template_finder
+
+
+@pytest.fixture(scope='module')
+def finders():
+    return {retrieval: build_finder(retrieval) for retrieval in TemplateFinder.RETRIEVAL_MODES}
+
+
+def scores_by_name(recommendations):
+    return dict(zip(recommendations['Template Name'], recommendations['Similarity Score']))
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_cascade_scores_match_full_for_shared_candidates(finders, query):
+    full = scores_by_name(finders['full'].find_similar_templates(query, top_k=20))
+    cascade = scores_by_name(finders['cascade'].find_similar_templates(query, top_k=20))
+
+    shared = set(full) & set(cascade)
+    assert shared
+    for name in shared:
+        assert cascade[name] == pytest.approx(full[name], abs=0.01)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_cascade_top_k_none_ranks_every_template(finders, query):
+    full = finders['full'].find_similar_templates(query, top_k=None)
+    cascade = finders['cascade'].find_similar_templates(query, top_k=None)
+
+    assert cascade.attrs['retrieval'] == 'cascade'
+    # With no cap every template is a candidate, so the cascade returns the full ranking
+    assert scores_by_name(cascade) == pytest.approx(scores_by_name(full), abs=0.01)
+    pd.testing.assert_series_equal(
+        cascade['Similarity Score'].reset_index(drop=True), full['Similarity Score'].reset_index(drop=True),
+        atol=0.01,
+    )
+
+
+def test_cascade_recall_report_accepts_top_k_none(finders):
+    report = finders['cascade'].check_cascade_recall(QUERIES, top_k=None)
+
+    assert report['recall'] == 1.0
+    assert report['mean_candidates'] == 300
+
+
+@pytest.mark.parametrize('embedding_dtype', ['float32', 'float16', 'int8'])
+def test_reload_reuses_embeddings_without_rounding_them_twice(embedding_dtype):
+    client_profiles, template_tags, template_details = generate_sheets(300, seed=1)
+    data_loader = InMemoryDataLoader(client_profiles, template_tags, template_details)
+    reloaded = TemplateFinder(data_loader, sentence_model=HashingEncoder(seed=1), embedding_dtype=embedding_dtype)
+    reloaded.build_index()
+
+    # Edit one description; every other template keeps its embedding across the reload
+    template_details = template_details.copy()
+    template_details.loc[0, 'description'] = 'cricket quiz scratch card for the festive sale'
+    data_loader.template_details = template_details
+    reloaded.build_index()
+    assert reloaded.last_reload['reencoded'] == 1
+
+    fresh = TemplateFinder(
+        InMemoryDataLoader(client_profiles, template_tags, template_details),
+        sentence_model=HashingEncoder(seed=1), embedding_dtype=embedding_dtype,
+    )
+    fresh.build_index()
+
+    np.testing.assert_allclose(
+        reloaded.index.embeddings.to_float32(), fresh.index.embeddings.to_float32(), atol=1e-6
+    )
+    for query in QUERIES:
+        pd.testing.assert_frame_equal(
+            reloaded.find_similar_templates(query, top_k=20), fresh.find_similar_templates(query, top_k=20)
+        )
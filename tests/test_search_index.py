@@ -0,0 +1,67 @@
+# tests/test_search_index.py
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from benchmarks.pipeline_benchmark import HashingEncoder
+from finder import TemplateFinder
+from search_index import TemplateIndex, top_k_indices
+
+
+def zipf_corpus(n_templates, n_words, seed=0):
+    """Template texts over a Zipf-distributed vocabulary, like descriptions plus client keywords"""
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(n_words)]
+    ids = np.minimum(rng.zipf(1.3, size=(n_templates, 12)), n_words) - 1
+    return [' '.join(words[i] for i in row) for row in ids], words
+
+
+def sample_queries(words, seed=0, n_queries=30):
+    rng = np.random.default_rng(seed)
+    queries = [' '.join(rng.choice(words, size=rng.integers(1, 4))) for _ in range(n_queries)]
+    # Query-only terms, alone and next to corpus terms
+    return queries + ['holographic banner', f'holographic {words[0]}', f'{words[1]} {words[2]} quokka', '']
+
+
+def refit_finder(max_features):
+    template_finder = TemplateFinder(None, sentence_model=HashingEncoder())
+    template_finder.vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2), max_features=max_features)
+    return template_finder
+
+
+@pytest.mark.parametrize('max_features', [None, 100000, 300, 40])
+def test_tfidf_scores_match_refit_with_and_without_vocabulary_cap(max_features):
+    corpus, words = zipf_corpus(400, 2000)
+    template_finder = refit_finder(max_features)
+    index = TemplateIndex(corpus, [{} for _ in corpus], template_finder.vectorizer)
+    if max_features is not None and max_features < 1000:
+        # The cap really is exceeded by the corpus vocabulary
+        assert len(index.vocabulary) > max_features
+
+    queries = sample_queries(words)
+    scores = index.tfidf_scores(queries)
+    for query, row in zip(queries, scores):
+        expected = template_finder.calculate_tfidf_similarity(query, corpus)
+        np.testing.assert_allclose(row, expected, rtol=1e-9, atol=1e-12)
+        assert np.array_equal(
+            top_k_indices(row[np.newaxis], 20), top_k_indices(expected[np.newaxis], 20)
+        )
+
+
+@pytest.mark.parametrize('max_features', [None, 40])
+def test_lexical_candidates_score_like_tfidf_scores(max_features):
+    corpus, words = zipf_corpus(400, 2000, seed=1)
+    index = TemplateIndex(corpus, [{} for _ in corpus], refit_finder(max_features).vectorizer)
+    queries = sample_queries(words, seed=1)
+
+    full = index.tfidf_scores(queries)
+    for row, (template_ids, scores) in enumerate(index.lexical_candidates(queries, len(corpus))):
+        np.testing.assert_allclose(scores, full[row, template_ids], rtol=1e-9, atol=1e-12)
+        # Every template with a positive score is a candidate
+        assert set(np.flatnonzero(full[row] > 0)) <= set(template_ids)
+
+    # A smaller candidate set keeps the best-scoring templates
+    for row, (template_ids, scores) in enumerate(index.lexical_candidates(queries, 5)):
+        np.testing.assert_allclose(scores, full[row, template_ids], rtol=1e-9, atol=1e-12)
+        if len(template_ids):
+            assert scores.min() >= np.sort(full[row])[-len(template_ids)] - 1e-12
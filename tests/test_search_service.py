@@ -0,0 +1,74 @@
+# tests/test_search_service.py
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.pipeline_benchmark import HashingEncoder
+from benchmarks.synthetic import InMemoryDataLoader, generate_sheets
+from finder import TemplateFinder
+from search_service import SearchService
+
+
+@pytest.fixture(scope='module')
+def template_finder():
+    template_finder = TemplateFinder(InMemoryDataLoader(*generate_sheets(100)), sentence_model=HashingEncoder())
+    template_finder.build_index()
+    return template_finder
+
+
+async def exchange(template_finder, raw_requests):
+    """Send raw requests on one connection; returns each response's (status, payload)"""
+    service = await SearchService(template_finder, host='127.0.0.1', port=0).start()
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', service.port)
+        writer.write(b''.join(raw_requests))
+        await writer.drain()
+
+        responses = []
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                break
+            headers = {}
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers['content-length']))
+            responses.append((int(status_line.split()[1]), json.loads(body)))
+            if headers.get('connection') == 'close':
+                break
+        writer.close()
+        return responses
+    finally:
+        await service.stop()
+
+
+def search_request(body, content_length=None, close=True):
+    content_length = len(body) if content_length is None else content_length
+    return (
+        f"POST /search HTTP/1.1\r\nHost: test\r\nContent-Length: {content_length}\r\n"
+        f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n"
+    ).encode('latin-1') + body
+
+
+def test_search_over_keep_alive_connection(template_finder):
+    body = json.dumps({'query': 'cricket quiz', 'top_k': 5}).encode('utf-8')
+    responses = asyncio.run(exchange(template_finder, [search_request(body, close=False), search_request(body)]))
+
+    assert [status for status, _ in responses] == [200, 200]
+    assert responses[0][1] == responses[1][1]
+
+
+@pytest.mark.parametrize('content_length', ['abc', '1.5', '-1', '0x10'])
+def test_malformed_content_length_is_a_bad_request(template_finder, content_length):
+    body = json.dumps({'query': 'cricket quiz'}).encode('utf-8')
+    responses = asyncio.run(exchange(template_finder, [search_request(body, content_length)]))
+
+    assert responses == [(400, {'error': 'Malformed Content-Length header'})]
+
+
+def test_oversized_body_is_rejected(template_finder):
+    responses = asyncio.run(exchange(template_finder, [search_request(b'', content_length=(1 << 20) + 1)]))
+
+    assert [status for status, _ in responses] == [413]
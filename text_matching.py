@@ -0,0 +1,88 @@
+# text_matching.py
+import re
+from collections import deque
+
+import pandas as pd
+
+# Characters that make pandas' regex-based str.contains differ from a plain substring test
+REGEX_SPECIAL = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+
+class MultiPatternMatcher:
+    """Aho-Corasick automaton reporting which of many patterns occur in a text"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                child = self._goto[node].get(ch)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][ch] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append(pattern_id)
+
+        # Breadth-first pass to wire up failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def search(self, text):
+        """Return the ids of every pattern occurring in ``text``"""
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            if self._out[node]:
+                found.update(self._out[node])
+        return found
+
+
+def find_containing_rows(needles, haystack):
+    """Map each needle to the positions of ``haystack`` entries containing it.
+
+    Matches ``haystack.str.contains(needle, case=False, na=False)`` for every
+    needle. Plain ASCII needles go through a single Aho-Corasick pass over the
+    haystack; needles that pandas would treat as a regex (or that need Unicode
+    case folding) fall back to ``str.contains`` itself.
+    """
+    needles = list(dict.fromkeys(needles))
+    literal = [n for n in needles if n and n.isascii() and not REGEX_SPECIAL.search(n)]
+    literal_set = set(literal)
+
+    matches = {needle: [] for needle in needles}
+    values = haystack.tolist()
+
+    if literal:
+        matcher = MultiPatternMatcher([needle.lower() for needle in literal])
+        for position, value in enumerate(values):
+            if not isinstance(value, str):
+                continue
+            for pattern_id in matcher.search(value.lower()):
+                matches[literal[pattern_id]].append(position)
+        for needle in literal:
+            matches[needle].sort()
+
+    for needle in needles:
+        if needle not in literal_set:
+            mask = pd.Series(values, dtype=object).str.contains(needle, case=False, na=False)
+            matches[needle] = mask.to_numpy().nonzero()[0].tolist()
+
+    return matches